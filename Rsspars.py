@@ -1,22 +1,628 @@
 import warnings
 import feedparser
 import sqlite3
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 import time
 from typing import Dict, Any
-import html
 import requests
-from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib.parse import urlsplit
 import json
 import os
+import argparse
+import hashlib
+import heapq
+import bisect
+import shutil
+import statistics
+import threading
+from contextlib import nullcontext
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from textcleanup import TextCleaner, ensure_cleanup_column
+from dateparse import DateParser, parse_stored_date
+from feedstream import read_new_entries
+from pipeline import IngestPipeline
+from sharding import ShardCoordinator, worker_path
+from metrics import Metrics, attach_sinks
+from alerts import AlertBus, AlertServer
+from search import ensure_fts
+from channels import channel_from_url, CHANNEL_SQL
 
 warnings.filterwarnings('ignore', category=DeprecationWarning)
 
+# Значения по умолчанию для секций конфига
+DEFAULT_CONFIG = {
+    'check_intervals': {
+        'initial': 30,
+        'min': 15,
+        'max': 60,
+        'increment': 5,
+        'rate_factor': 0.5,     # доля типичного промежутка между постами канала
+        'rate_window': 20       # сколько последних постов учитывать
+    },
+    'fetch': {
+        'timeout': 10,          # таймаут одного запроса, сек
+        'max_workers': 16,      # общий лимит одновременных запросов
+        'per_host_limit': 2,    # лимит одновременных запросов к одному хосту
+        'stream_parse': True    # потоковый разбор фида до первого известного поста
+    },
+    'http_pool': {
+        'pool_connections': 4,  # число пулов соединений в сессии хоста
+        'pool_maxsize': 4,      # соединений в пуле одного хоста
+        'keep_alive': True
+    },
+    'hedging': {
+        'channels': [],         # каналы, где скорость важнее полноты
+        'quantile': 0.5,        # квантиль латентности зеркала для задержки хеджа
+        'default_delay': 1.0,   # задержка, пока по зеркалу нет замеров, сек
+        'max_samples': 50       # размер окна замеров латентности
+    },
+    'health': {
+        'failure_threshold': 3, # ошибок подряд до размыкания цепи
+        'base_backoff': 60,     # первая пауза для упавшего зеркала, сек
+        'max_backoff': 3600,    # максимальная пауза, сек
+        'ewma_alpha': 0.3       # вес нового замера в EWMA латентности
+    },
+    'database': {
+        'journal_mode': 'WAL',  # читатели (аналитика) не блокируют запись
+        'synchronous': 'NORMAL',
+        'cache_size_kb': 8192,
+        'cached_statements': 256,
+        'busy_timeout': 30      # ожидание блокировки другим процессом, сек
+    },
+    'seen_filter': {
+        'memory_budget_kb': 1024  # память под LRU последних post_id
+    },
+    'txt_export': {
+        'path': 'tg-posts.txt',
+        'summary_path': 'tg-posts-summary.txt'
+    },
+    'pipeline': {
+        'enabled': False,       # разбор и очистка в пуле процессов (pipeline.py)
+        'processes': 0,         # 0 - по числу ядер
+        'queue_size': 64        # ответов зеркал между загрузкой и записью
+    },
+    'metrics': {
+        'console': True,        # консоль: статусы зеркал, итоги и метрики цикла
+        'jsonl_path': '',       # файл снимков метрик JSONL ('' - не писать)
+        'jsonl_max_kb': 10240,  # размер файла до ротации
+        'jsonl_backups': 3,
+        'prometheus_port': 0,   # порт эндпоинта /metrics (0 - выключен)
+        'prometheus_host': '0.0.0.0'
+    },
+    'alerts': {
+        'buffer_size': 1000,    # последних событий для догона подписчиков
+        'sse_port': 0,          # порт потока /events (0 - выключен)
+        'sse_host': '127.0.0.1'
+    },
+    'sharding': {
+        'lease_db': 'worker-leases.sqlite',  # общая таблица аренды воркеров
+        'lease_ttl': 90,        # воркер без heartbeat дольше - считается мертвым, сек
+        'heartbeat_interval': 15,
+        'replicas': 64          # точек воркера на кольце хешей
+    }
+}
+
+class SeenFilter:
+    """Фильтр уже виденных постов перед БД: водяной знак канала + LRU последних post_id"""
+
+    # Оценка памяти на одну запись LRU: строка post_id и узел OrderedDict
+    ENTRY_BYTES = 120
+
+    def __init__(self, memory_budget_kb: int, watermark_loader):
+        self.capacity = max(memory_budget_kb * 1024 // self.ENTRY_BYTES, 1)
+        self.watermark_loader = watermark_loader
+        self.recent = OrderedDict()
+        self.watermarks = {}
+        # Водяные знаки каналов, принятых от другого воркера: посты не новее
+        # уже записаны в его БД
+        self.handoff = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'new': 0, 'misses': 0}
+
+    def warm(self, post_ids: list):
+        """Заполнение LRU post_id из БД, от старых к новым"""
+        with self.lock:
+            for post_id in post_ids:
+                self.remember(post_id)
+
+    def remember(self, post_id: str):
+        self.recent[post_id] = None
+        self.recent.move_to_end(post_id)
+        if len(self.recent) > self.capacity:
+            self.recent.popitem(last=False)
+
+    def get_watermark(self, channel: str) -> int:
+        """Максимальный числовой post_id канала в БД (загружается при первом обращении)"""
+        with self.lock:
+            if channel not in self.watermarks:
+                self.watermarks[channel] = self.watermark_loader(channel)
+            return self.watermarks[channel]
+
+    def seed(self, channel: str, post_id: int):
+        """Канал перешел от другого воркера, который записал посты до post_id"""
+        watermark = self.get_watermark(channel)
+        with self.lock:
+            self.handoff[channel] = post_id
+            if watermark is None or post_id > watermark:
+                self.watermarks[channel] = post_id
+
+    def check(self, channel: str, post_id: str) -> str:
+        """'seen' - точно есть в БД (своей или прежнего владельца канала), 'new' - точно нет, 'unknown' - нужен запрос к БД"""
+        watermark = self.get_watermark(channel)
+        with self.lock:
+            if post_id in self.recent:
+                self.recent.move_to_end(post_id)
+                self.stats['hits'] += 1
+                return 'seen'
+            if post_id.isdigit() and channel in self.handoff and int(post_id) <= self.handoff[channel]:
+                self.stats['hits'] += 1
+                return 'seen'
+            if post_id.isdigit() and (watermark is None or int(post_id) > watermark):
+                self.stats['new'] += 1
+                return 'new'
+            self.stats['misses'] += 1
+            return 'unknown'
+
+    def add(self, channel: str, post_ids: list):
+        """Учет post_id, которые теперь точно есть в БД"""
+        with self.lock:
+            for post_id in post_ids:
+                self.remember(post_id)
+                if post_id.isdigit() and channel in self.watermarks:
+                    watermark = self.watermarks[channel]
+                    if watermark is None or int(post_id) > watermark:
+                        self.watermarks[channel] = int(post_id)
+
+class PostsTxtWriter:
+    """Выгрузка постов в текстовый файл по времени (старые первыми) с индексом смещений
+
+    Рядом с файлом лежит индекс <файл>.idx из строк фиксированной длины
+    "<timestamp> <смещение>", поэтому новый пост дописывается в конец, а
+    опоздавший вставляется на свое место с перезаписью только хвоста.
+    """
+
+    SEPARATOR = b'\n\n'
+    INDEX_LINE = '{:020.6f} {:015d}\n'
+    INDEX_LINE_SIZE = 37
+    SUMMARY_MARKERS = ["Всего собрано постов:", "Статистика по каналам:", "=" * 10]
+
+    def __init__(self, path: str, summary_path: str):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.summary_path = summary_path
+        self.timestamps = []
+        self.offsets = []
+        self.size = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def format_entry(post_data: Dict[str, Any]) -> bytes:
+        entry = f"[{post_data['published_date']}] {post_data['content']}\nИсточник: {post_data['source_url']}"
+        return entry.encode('utf-8')
+
+    @staticmethod
+    def entry_timestamp(entry: str) -> float:
+        """Время поста из префикса [дата]; нераспознанные даты - в начало файла"""
+        date = parse_stored_date(entry[1:entry.find(']')]) if entry.startswith('[') else None
+        return date.timestamp() if date else 0.0
+
+    def load(self):
+        """Загрузка индекса; если его нет, он поврежден или не сходится с файлом - перестройка"""
+        if not os.path.exists(self.path):
+            open(self.path, 'wb').close()
+        self.size = os.path.getsize(self.path)
+
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='ascii') as f:
+                    lines = f.readlines()
+                for line in lines:
+                    timestamp, offset = line.split()
+                    self.timestamps.append(float(timestamp))
+                    self.offsets.append(int(offset))
+                # Оборванная запись индекса (прерванная дозапись) - не целое число строк
+                index_ok = os.path.getsize(self.index_path) == len(lines) * self.INDEX_LINE_SIZE
+            except (ValueError, UnicodeDecodeError):
+                index_ok = False
+            if index_ok and self.index_is_valid():
+                return
+            print(f"⚠️ Индекс {self.index_path} не сходится с файлом, перестраиваю")
+            self.timestamps, self.offsets = [], []
+
+        self.rebuild()
+
+    def index_is_valid(self) -> bool:
+        """Первая запись с начала файла, последняя - целиком до конца файла"""
+        if not self.offsets:
+            return self.size == 0
+        if self.offsets[0] != 0 or self.offsets != sorted(self.offsets) or self.offsets[-1] >= self.size:
+            return False
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[-1])
+            last_entry = f.read()
+        # После последней проиндексированной записи не должно быть других записей
+        return (
+            last_entry.startswith(b'[')
+            and last_entry.endswith(self.SEPARATOR)
+            and self.SEPARATOR + b'[' not in last_entry[:-len(self.SEPARATOR)]
+        )
+
+    def rebuild(self):
+        """Разовая перестройка: убираем старую сводку, сортируем, пишем файл и индекс
+
+        Файл переписывается в порядке от старых постов к новым (прежняя
+        выгрузка шла от новых к старым), поэтому непустой файл сначала
+        копируется в <файл>.bak.
+        """
+        if self.size:
+            backup_path = self.path + '.bak'
+            shutil.copyfile(self.path, backup_path)
+            print(f"💾 Копия {self.path} перед перестройкой: {backup_path}")
+        with open(self.path, 'r', encoding='utf-8') as f:
+            raw_entries = f.read().split('\n\n')
+        entries = [
+            entry.strip() for entry in raw_entries
+            if entry.strip().startswith('[')
+            and not any(marker in entry for marker in self.SUMMARY_MARKERS)
+        ]
+        items = sorted(
+            ((self.entry_timestamp(entry), entry.encode('utf-8')) for entry in entries),
+            key=lambda item: item[0]
+        )
+        self.timestamps, self.offsets, self.size = [], [], 0
+        self.write_from(0, items)
+
+    def write_from(self, position: int, items: list):
+        """Перезапись файла и индекса начиная с записи номер position"""
+        start = self.offsets[position] if position < len(self.offsets) else self.size
+        del self.timestamps[position:]
+        del self.offsets[position:]
+
+        chunks = []
+        offset = start
+        for timestamp, entry in items:
+            self.timestamps.append(timestamp)
+            self.offsets.append(offset)
+            chunks.append(entry + self.SEPARATOR)
+            offset += len(entry) + len(self.SEPARATOR)
+
+        mode = 'r+b' if os.path.exists(self.path) else 'wb'
+        with open(self.path, mode) as f:
+            f.seek(start)
+            f.write(b''.join(chunks))
+            f.truncate()
+        self.size = offset
+
+        index_mode = 'r+' if os.path.exists(self.index_path) else 'w'
+        with open(self.index_path, index_mode, encoding='ascii') as f:
+            f.seek(position * self.INDEX_LINE_SIZE)
+            f.write(''.join(
+                self.INDEX_LINE.format(timestamp, offset)
+                for timestamp, offset in zip(self.timestamps[position:], self.offsets[position:])
+            ))
+            f.truncate()
+
+    def read_tail(self, position: int) -> list:
+        """Записи файла начиная с position вместе с их временем"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[position])
+            data = f.read()
+        base = self.offsets[position]
+        bounds = [offset - base for offset in self.offsets[position:]] + [len(data)]
+        return [
+            (timestamp, data[begin:end - len(self.SEPARATOR)])
+            for timestamp, begin, end in zip(self.timestamps[position:], bounds, bounds[1:])
+        ]
+
+    def add(self, posts: list):
+        """Добавление постов: обычно дозапись в конец, опоздавшие - в середину"""
+        items = sorted(
+            ((self.entry_timestamp(f"[{post['published_date']}]"), self.format_entry(post))
+             for post in posts),
+            key=lambda item: item[0]
+        )
+        if not items:
+            return
+        with self.lock:
+            position = bisect.bisect_right(self.timestamps, items[0][0])
+            if position < len(self.timestamps):
+                # Слияние с хвостом файла, существующие записи при равном времени раньше
+                items = list(heapq.merge(self.read_tail(position), items, key=lambda item: item[0]))
+            self.write_from(position, items)
+
+    def write_summary(self, summary: str):
+        """Сводка хранится в отдельном файле и переписывается целиком"""
+        with open(self.summary_path, 'w', encoding='utf-8') as f:
+            f.write(summary.strip() + '\n')
+
+class SourceHealth:
+    """Здоровье зеркал: успешность, EWMA латентности, пустые фиды и circuit breaker"""
+
+    def __init__(self, conn: sqlite3.Connection, db_lock: threading.RLock, config: dict):
+        self.conn = conn
+        self.db_lock = db_lock
+        self.config = config
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def init_db(self):
+        """Создание таблицы и загрузка сохраненного состояния"""
+        with self.db_lock, self.conn as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS source_health (
+                    source TEXT PRIMARY KEY,
+                    successes INTEGER DEFAULT 0,
+                    failures INTEGER DEFAULT 0,
+                    empty INTEGER DEFAULT 0,
+                    latency_ewma REAL,
+                    consecutive_failures INTEGER DEFAULT 0,
+                    open_until REAL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                SELECT source, successes, failures, empty, latency_ewma,
+                       consecutive_failures, open_until
+                FROM source_health
+            ''')
+            for row in cursor.fetchall():
+                source, successes, failures, empty, latency_ewma, consecutive, open_until = row
+                self.stats[source] = {
+                    'successes': successes,
+                    'failures': failures,
+                    'empty': empty,
+                    'latency_ewma': latency_ewma,
+                    'consecutive_failures': consecutive,
+                    'open_until': open_until,
+                    'probing': False
+                }
+
+    def save(self):
+        """Сохранение состояния зеркал в БД"""
+        with self.lock:
+            rows = [
+                (source, data['successes'], data['failures'], data['empty'],
+                 data['latency_ewma'], data['consecutive_failures'], data['open_until'])
+                for source, data in self.stats.items()
+            ]
+        try:
+            with self.db_lock, self.conn as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO source_health
+                    (source, successes, failures, empty, latency_ewma,
+                     consecutive_failures, open_until, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', rows)
+        except sqlite3.Error as e:
+            print(f"⚠️ Ошибка при сохранении здоровья зеркал: {e}")
+
+    def get_stats(self, source: str) -> dict:
+        if source not in self.stats:
+            self.stats[source] = {
+                'successes': 0,
+                'failures': 0,
+                'empty': 0,
+                'latency_ewma': None,
+                'consecutive_failures': 0,
+                'open_until': 0,
+                'probing': False
+            }
+        return self.stats[source]
+
+    def is_open(self, source: str) -> bool:
+        """Цепь зеркала разомкнута и пауза еще не истекла"""
+        with self.lock:
+            return self.get_stats(source)['open_until'] > time.time()
+
+    def is_available(self, source: str) -> bool:
+        """Можно ли обращаться к зеркалу (после паузы - один пробный запрос)"""
+        with self.lock:
+            data = self.get_stats(source)
+            if not data['open_until']:
+                return True
+            if data['probing'] or time.time() < data['open_until']:
+                return False
+            data['probing'] = True
+            return True
+
+    def record(self, source: str, outcome: str, latency: float = None):
+        """Учет результата запроса: 'success', 'empty' или 'failure'"""
+        with self.lock:
+            data = self.get_stats(source)
+            data['probing'] = False
+            if latency is not None:
+                alpha = self.config['ewma_alpha']
+                previous = data['latency_ewma']
+                data['latency_ewma'] = latency if previous is None else (
+                    alpha * latency + (1 - alpha) * previous
+                )
+
+            if outcome == 'failure':
+                data['failures'] += 1
+                data['consecutive_failures'] += 1
+                over_threshold = data['consecutive_failures'] - self.config['failure_threshold']
+                if over_threshold >= 0:
+                    backoff = min(
+                        self.config['base_backoff'] * 2 ** over_threshold,
+                        self.config['max_backoff']
+                    )
+                    data['open_until'] = time.time() + backoff
+            else:
+                data['successes' if outcome == 'success' else 'empty'] += 1
+                data['consecutive_failures'] = 0
+                data['open_until'] = 0
+
+    def score(self, source: str) -> float:
+        """Оценка зеркала: доля успехов с поправкой на пустые фиды и латентность"""
+        data = self.get_stats(source)
+        total = data['successes'] + data['failures'] + data['empty']
+        success_rate = (data['successes'] + 1) / (total + 2)
+        answered = data['successes'] + data['empty']
+        empty_rate = data['empty'] / answered if answered else 0
+        return success_rate * (1 - empty_rate) / (1 + (data['latency_ewma'] or 0))
+
+    def order(self, sources: list) -> list:
+        """Зеркала по убыванию оценки, с разомкнутой цепью - в конце"""
+        now = time.time()
+        with self.lock:
+            return sorted(
+                sources,
+                key=lambda source: (self.get_stats(source)['open_until'] > now, -self.score(source))
+            )
+
+    def report(self, sources: list) -> list:
+        """Состояние зеркал для вывода и мониторинга"""
+        now = time.time()
+        with self.lock:
+            report = []
+            for source in sources:
+                data = self.get_stats(source)
+                total = data['successes'] + data['failures'] + data['empty']
+                report.append({
+                    'source': source,
+                    'score': self.score(source),
+                    'requests': total,
+                    'success_rate': data['successes'] / total if total else None,
+                    'empty_rate': data['empty'] / total if total else None,
+                    'latency_ewma': data['latency_ewma'],
+                    'consecutive_failures': data['consecutive_failures'],
+                    'open_until': data['open_until'] if data['open_until'] > now else None
+                })
+        return sorted(report, key=lambda item: -item['score'])
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, который считает запросы и новые соединения пула"""
+
+    def __init__(self, *args, **kwargs):
+        # Счетчики нужны до super().__init__, который создает пул
+        self.stats = {'requests': 0, 'connections': 0}
+        self.stats_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                adapter.count('connections')
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                adapter.count('connections')
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool
+        }
+
+    def send(self, request, **kwargs):
+        self.count('requests')
+        return super().send(request, **kwargs)
+
+class ChannelScheduler:
+    """Очередь опроса: у каждого канала свой интервал и время следующей проверки"""
+
+    def __init__(self, channels: list, intervals: dict):
+        self.intervals_config = intervals
+        self.intervals = {}
+        self.targets = {}
+        self.heap = []
+        self.scheduled = set()
+        for channel in channels:
+            self.add(channel)
+
+    def add(self, channel: str):
+        """Новый канал проверяется сразу (вернувшийся - по прежней записи в очереди)"""
+        if channel in self.intervals:
+            return
+        self.intervals[channel] = self.intervals_config['initial']
+        self.targets[channel] = self.intervals_config['max']
+        # Запись, оставшаяся в куче после remove(), снова становится действующей
+        if channel not in self.scheduled:
+            self.push(channel, time.monotonic())
+
+    def remove(self, channel: str):
+        """Канал больше не опрашивается (запись в куче отбрасывается при извлечении)"""
+        self.intervals.pop(channel, None)
+        self.targets.pop(channel, None)
+
+    def drop_removed(self):
+        while self.heap and self.heap[0][1] not in self.intervals:
+            _, channel = heapq.heappop(self.heap)
+            self.scheduled.discard(channel)
+
+    def push(self, channel: str, due: float):
+        heapq.heappush(self.heap, (due, channel))
+        self.scheduled.add(channel)
+
+    def set_target(self, channel: str, target: float):
+        """Целевой интервал канала, оцененный по частоте его постов"""
+        self.targets[channel] = target
+        self.intervals[channel] = min(self.intervals[channel], target)
+
+    def pop_due(self) -> list:
+        """Каналы, время проверки которых наступило"""
+        now = time.monotonic()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            _, channel = heapq.heappop(self.heap)
+            self.scheduled.discard(channel)
+            if channel in self.intervals:
+                due.append(channel)
+        return due
+
+    def reschedule(self, channel: str, new_posts: int):
+        """Новые посты - опрашиваем чаще, тишина - интервал растет до целевого"""
+        if new_posts > 0:
+            interval = self.intervals_config['min']
+        else:
+            interval = min(
+                self.intervals[channel] + self.intervals_config['increment'],
+                self.targets[channel]
+            )
+        self.intervals[channel] = interval
+        self.push(channel, time.monotonic() + interval)
+
+    def reschedule_missing(self, interval: float):
+        """Возврат в очередь каналов, выпавших из нее из-за ошибки"""
+        for channel in self.intervals:
+            if channel not in self.scheduled:
+                self.intervals[channel] = interval
+                self.push(channel, time.monotonic() + interval)
+
+    def seconds_until_next(self) -> tuple:
+        """Пауза до ближайшей проверки и канал, который будет проверен"""
+        self.drop_removed()
+        if not self.heap:
+            return self.intervals_config['max'], None
+        due, channel = self.heap[0]
+        return max(due - time.monotonic(), 0), channel
+
 class TelegramRSSParser:
-    def __init__(self, db_name: str = "tg-posts.db", config_file: str = "config.json"):
-        self.db_name = db_name
+    def __init__(self, db_name: str = "tg-posts.db", config_file: str = "config.json",
+                 worker_id: str = None):
+        # У воркера шарда свои БД и выгрузка; объединение - migratedb.py
+        self.worker_id = worker_id
+        self.db_name = worker_path(db_name, worker_id)
         self.config = self.load_config(config_file)
         self.channels = self.config.get('channels', [])
+        self.text_cleaner = TextCleaner(self.config.get('text_cleanup', {}))
+        self.date_parser = DateParser()
+        self.metrics = Metrics()
+        self.alerts = AlertBus(self.config['alerts']['buffer_size'], self.metrics)
+        self.connect_db()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         }
@@ -26,40 +632,97 @@ class TelegramRSSParser:
             "https://rsshub.app/telegram/channel/{channel}",
             "https://telegram.meta.ua/rss/{channel}",
             "https://tg.i-c-a.su/rss/{channel}?format=html",
-"https://rss-bridge.org/bridge01/?action=display&bridge=TelegramBridge&username={channel}&format=Html
+            "https://rss-bridge.org/bridge01/?action=display&bridge=TelegramBridge&username={channel}&format=Html"
         ]
+
+        # Параллельная загрузка: общий пул потоков и семафоры на каждый хост
+        fetch_config = self.config['fetch']
+        self.fetch_timeout = fetch_config['timeout']
+        self.stream_parse = fetch_config['stream_parse']
+        self.per_host_limit = fetch_config['per_host_limit']
+        self.executor = ThreadPoolExecutor(
+            max_workers=fetch_config['max_workers'],
+            thread_name_prefix='fetch'
+        )
+        self.host_semaphores = {}
+        self.host_semaphores_lock = threading.Lock()
+
+        # Хеджирование: каналы-тревоги опрашивают зеркала по очереди с задержкой.
+        # У их запросов свои потоки: в общем пуле они ждали бы обычные каналы
+        self.hedging = self.config['hedging']
+        self.hedged_channels = set(self.hedging['channels'])
+        self.hedge_executor = ThreadPoolExecutor(
+            max_workers=max(len(self.hedged_channels), 1),
+            thread_name_prefix='hedge'
+        )
+        self.hedge_fetch_executor = ThreadPoolExecutor(
+            max_workers=max(len(self.hedged_channels), 1) * len(self.rss_sources),
+            thread_name_prefix='hedge-fetch'
+        )
+        self.source_latencies = {}
+        self.source_latencies_lock = threading.Lock()
+
+        self.source_health = SourceHealth(self.conn, self.db_lock, self.config['health'])
+
+        # Пул keep-alive сессий, по одной на хост зеркала
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        for source_url in self.rss_sources:
+            self.get_session(source_url)
+
         self.init_db()
 
+        txt_config = self.config['txt_export']
+        self.txt_writer = PostsTxtWriter(
+            worker_path(txt_config['path'], worker_id),
+            worker_path(txt_config['summary_path'], worker_id)
+        )
+
+        self.seen_filter = SeenFilter(
+            self.config['seen_filter']['memory_budget_kb'],
+            self.get_newest_post_id
+        )
+        self.warm_seen_filter()
+
     def load_config(self, config_file: str) -> dict:
         """Загрузка конфигурации из JSON файла"""
         try:
             with open(config_file, 'r', encoding='utf-8') as f:
                 config = json.load(f)
-                
-            # Установка значений по умолчанию, если их нет в конфиге
-            if 'check_intervals' not in config:
-                config['check_intervals'] = {
-                    'initial': 30,
-                    'min': 15,
-                    'max': 60,
-                    'increment': 5
-                }
-            return config
         except Exception as e:
             print(f"Ошибка загрузки конфигурации: {e}")
-            return {
-                'channels': [],
-                'check_intervals': {
-                    'initial': 30,
-                    'min': 15,
-                    'max': 60,
-                    'increment': 5
-                }
-            }
+            config = {'channels': []}
+
+        # Установка значений по умолчанию, если их нет в конфиге
+        for section, defaults in DEFAULT_CONFIG.items():
+            config[section] = {**defaults, **config.get(section, {})}
+        return config
+
+    def connect_db(self):
+        """Одно долгоживущее соединение с БД на весь парсер"""
+        db_config = self.config['database']
+        self.db_lock = threading.RLock()
+        self.conn = sqlite3.connect(
+            self.db_name,
+            timeout=db_config['busy_timeout'],
+            cached_statements=db_config['cached_statements'],
+            check_same_thread=False
+        )
+        self.conn.execute(f"PRAGMA journal_mode={db_config['journal_mode']}")
+        self.conn.execute(f"PRAGMA synchronous={db_config['synchronous']}")
+        self.conn.execute(f"PRAGMA cache_size={-db_config['cache_size_kb']}")
+
+    def close(self):
+        """Закрытие соединения с БД и пулов потоков"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.hedge_executor.shutdown(wait=False, cancel_futures=True)
+        self.hedge_fetch_executor.shutdown(wait=False, cancel_futures=True)
+        with self.db_lock:
+            self.conn.close()
 
     def init_db(self):
         """Инициализация БД с поддержкой UTC"""
-        with sqlite3.connect(self.db_name) as conn:
+        with self.db_lock, self.conn as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS posts (
@@ -72,100 +735,504 @@ class TelegramRSSParser:
                 )
             ''')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_post_id ON posts(post_id)')
+
+            # Валидаторы условных запросов для пары (канал, зеркало)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_validators (
+                    channel TEXT,
+                    source TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (channel, source)
+                )
+            ''')
+            self.migrate_channel_stats(cursor)
+            ensure_cleanup_column(cursor)
+            ensure_fts(cursor)
             conn.commit()
 
+        self.load_validators()
+        self.source_health.init_db()
+
+    def migrate_channel_stats(self, cursor: sqlite3.Cursor):
+        """Колонка channel и счетчики по каналам/дням, которые ведут триггеры
+
+        Для старых БД колонка заполняется из source_url, а счетчики
+        пересчитываются один раз - при первом создании триггеров.
+        """
+        cursor.execute('PRAGMA table_info(posts)')
+        if 'channel' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE posts ADD COLUMN channel TEXT')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_posts_channel ON posts(channel)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS channel_stats (
+                channel TEXT PRIMARY KEY,
+                post_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_stats (
+                date TEXT PRIMARY KEY,
+                post_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'posts_stats_insert'")
+        if cursor.fetchone():
+            return
+
+        print("🔄 Заполнение колонки channel и счетчиков по каналам...")
+        cursor.execute(f'''
+            UPDATE posts SET channel = {CHANNEL_SQL.format(url='source_url')}
+            WHERE channel IS NULL
+        ''')
+        cursor.execute('DELETE FROM channel_stats')
+        cursor.execute('''
+            INSERT INTO channel_stats (channel, post_count)
+            SELECT channel, COUNT(*) FROM posts GROUP BY channel
+        ''')
+        cursor.execute('DELETE FROM daily_stats')
+        cursor.execute('''
+            INSERT INTO daily_stats (date, post_count)
+            SELECT DATE(published_date), COUNT(*) FROM posts
+            WHERE DATE(published_date) IS NOT NULL
+            GROUP BY DATE(published_date)
+        ''')
+
+        # Записи без channel (например, из migratedb.py) дополняются триггером
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS posts_channel_fill
+            AFTER INSERT ON posts WHEN NEW.channel IS NULL
+            BEGIN
+                UPDATE posts SET channel = {CHANNEL_SQL.format(url='NEW.source_url')}
+                WHERE id = NEW.id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS posts_stats_insert
+            AFTER INSERT ON posts
+            BEGIN
+                INSERT INTO channel_stats (channel, post_count)
+                VALUES (COALESCE(NEW.channel, {CHANNEL_SQL.format(url='NEW.source_url')}), 1)
+                ON CONFLICT(channel) DO UPDATE SET post_count = post_count + 1;
+                INSERT INTO daily_stats (date, post_count)
+                SELECT DATE(NEW.published_date), 1
+                WHERE DATE(NEW.published_date) IS NOT NULL
+                ON CONFLICT(date) DO UPDATE SET post_count = post_count + 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS posts_stats_delete
+            AFTER DELETE ON posts
+            BEGIN
+                UPDATE channel_stats SET post_count = post_count - 1
+                WHERE channel = COALESCE(OLD.channel, {CHANNEL_SQL.format(url='OLD.source_url')});
+                UPDATE daily_stats SET post_count = post_count - 1
+                WHERE date = DATE(OLD.published_date);
+            END
+        ''')
+
+    def load_validators(self):
+        """Загрузка кеша ETag/Last-Modified/хешей из БД"""
+        self.validators = {}
+        self.dirty_validators = set()
+        # Валидаторы каналов, посты которых еще не записаны (до commit_validators)
+        self.pending_validators = {}
+        self.validators_lock = threading.Lock()
+        with self.db_lock, self.conn as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT channel, source, etag, last_modified, content_hash
+                FROM feed_validators
+            ''')
+            for channel, source, etag, last_modified, content_hash in cursor.fetchall():
+                self.validators[(channel, source)] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'content_hash': content_hash
+                }
+
+    def save_validators(self):
+        """Сохранение измененных валидаторов в БД"""
+        with self.validators_lock:
+            rows = [
+                (channel, source, data['etag'], data['last_modified'], data['content_hash'])
+                for (channel, source), data in self.validators.items()
+                if (channel, source) in self.dirty_validators
+            ]
+            self.dirty_validators.clear()
+        if not rows:
+            return
+        try:
+            with self.db_lock, self.conn as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO feed_validators
+                    (channel, source, etag, last_modified, content_hash, updated_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', rows)
+        except sqlite3.Error as e:
+            print(f"⚠️ Ошибка при сохранении валидаторов: {e}")
+
     def clean_text(self, text: str) -> str:
         """Улучшенная очистка текста поста"""
         try:
-            # Загружаем настройки очистки
-            cleanup_config = self.config.get('text_cleanup', {})
-            remove_phrases = cleanup_config.get('remove_phrases', [])
-            remove_patterns = cleanup_config.get('remove_patterns', [])
-
-            # Удаляем HTML теги, но сохраняем структуру
-            text = text.replace('<br>', '\n')
-            text = text.replace('<br/>', '\n')
-            text = text.replace('<p>', '\n')
-            text = text.replace('</p>', '\n')
-            
-            # Обработка forwarded сообщений
-            if 'Forwarded From' in text:
-                text = text.split('</b>')[-1].strip()
-            
-            # Удаляем div контейнеры
-            if '<div class="tgme_widget_message_text' in text:
-                text = text.split('dir="auto">')[-1]
-                text = text.split('</div>')[0]
-                
-            # Удаляем все оставшиеся HTML теги
-            import re
-            text = re.sub('<[^<]+?>', '', text)
-            
-            # Удаляем заданные фразы
-            for phrase in remove_phrases:
-                text = text.replace(phrase, '')
-            
-            # Удаляем паттерны по регулярным выражениям
-            for pattern in remove_patterns:
-                text = re.sub(pattern, '', text)
-            
-            # Декодируем HTML сущности
-            text = html.unescape(text)
-            
-            # Очищаем пустые строки и лишние пробелы
-            lines = []
-            for line in text.splitlines():
-                line = line.strip()
-                if line and not any(phrase in line for phrase in remove_phrases):
-                    lines.append(line)
-            
-            text = '\n'.join(lines)
-            
-            # Удаляем множественные переносы строк
-            text = re.sub(r'\n\s*\n', '\n\n', text)
-            
-            return text.strip()
-            
+            return self.text_cleaner.clean(text)
         except Exception as e:
             print(f"⚠️ Ошибка при очистке текста: {e}")
             return text
 
-    def get_feed_data(self, channel_name: str) -> dict:
-        """Получение данных RSS из всех источников"""
-        all_entries = []
-        successful_source = None
+    def get_host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        """Семафор, ограничивающий число одновременных запросов к хосту"""
+        host = urlsplit(url).netloc
+        with self.host_semaphores_lock:
+            if host not in self.host_semaphores:
+                self.host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self.host_semaphores[host]
+
+    def get_session(self, url: str) -> requests.Session:
+        """Общая сессия с пулом соединений для хоста зеркала"""
+        host = urlsplit(url).netloc
+        with self.sessions_lock:
+            if host not in self.sessions:
+                pool_config = self.config['http_pool']
+                adapter = CountingHTTPAdapter(
+                    pool_connections=pool_config['pool_connections'],
+                    pool_maxsize=pool_config['pool_maxsize']
+                )
+                session = requests.Session()
+                session.headers.update(self.headers)
+                if not pool_config['keep_alive']:
+                    session.headers['Connection'] = 'close'
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.sessions[host] = session
+            return self.sessions[host]
 
-        print(f"\n{'='*50}")
-        print(f"Канал: {channel_name}")
-        print(f"{'='*50}")
+    def get_connection_stats(self) -> dict:
+        """Счетчики запросов и переиспользования соединений по хостам"""
+        stats = {}
+        with self.sessions_lock:
+            sessions = dict(self.sessions)
+        for host, session in sessions.items():
+            adapter = session.get_adapter('https://')
+            requests_count = adapter.stats['requests']
+            connections = adapter.stats['connections']
+            stats[host] = {
+                'requests': requests_count,
+                'connections': connections,
+                'reused': max(requests_count - connections, 0)
+            }
+        return stats
 
-        for source_url in self.rss_sources:
-            try:
-                url = source_url.format(channel=channel_name)
-                print(f"📡 {url.split('/')[2]}: ", end='')
-                
-                response = requests.get(
+    def fetch_source(self, channel_name: str, source_url: str, parse: bool = True,
+                     cancel: threading.Event = None) -> dict:
+        """Загрузка одного зеркала с условным GET
+
+        С parse=False тело ответа не разбирается, а возвращается в result['body']
+        вместе с водяным знаком канала - разбор делает конвейер (pipeline.py).
+        cancel - флаг хеджированного запроса: такие запросы не ждут семафор хоста,
+        а если флаг поднят (ответило другое зеркало), тело не читается и не разбирается.
+        """
+        url = source_url.format(channel=channel_name)
+        result = {
+            'url': url,
+            'source': source_url,
+            'entries': [],
+            'status': '',
+            'not_modified': False,
+            'reached_known': False,
+            'validators': None,
+            'latency': None
+        }
+        if not self.source_health.is_available(source_url):
+            result['status'] = "⛔ Зеркало временно отключено"
+            return result
+
+        with self.validators_lock:
+            cached = dict(self.validators.get((channel_name, source_url), {}))
+
+        request_headers = {}
+        if cached.get('etag'):
+            request_headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            request_headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            with nullcontext() if cancel else self.get_host_semaphore(url):
+                started = time.monotonic()
+                response = self.get_session(url).get(
                     url, 
-                    headers=self.headers, 
-                    timeout=10,
-                    verify=True
+                    headers=request_headers,
+                    timeout=self.fetch_timeout,
+                    verify=True,
+                    stream=cancel is not None
                 )
-                
-                if response.status_code == 200:
-                    feed = feedparser.parse(response.text)
-                    
-                    if hasattr(feed, 'entries') and len(feed.entries) > 0:
-                        all_entries.extend(feed.entries)
-                        successful_source = url
-                        print(f"✅ {len(feed.entries)} записей")
-                    else:
-                        print("❌ Пустой фид")
+                if cancel and cancel.is_set():
+                    # Соединение закрывается без чтения тела
+                    response.close()
+                    result['status'] = "⏹️ Отменен: ответило другое зеркало"
+                    return result
+                content = response.content
+                latency = time.monotonic() - started
+                self.record_latency(source_url, latency)
+            mirror = source_url.split('/')[2]
+            self.metrics.observe('rss_fetch_seconds', latency, mirror=mirror)
+
+            if response.status_code == 304:
+                self.metrics.inc('rss_fetch_responses_total', mirror=mirror, result='not_modified')
+                self.source_health.record(source_url, 'success', latency)
+                result['not_modified'] = True
+                result['status'] = "♻️ Не изменился (304)"
+                return result
+
+            if response.status_code != 200:
+                self.metrics.inc('rss_fetch_responses_total', mirror=mirror, result='error')
+                self.source_health.record(source_url, 'failure', latency)
+                result['status'] = f"❌ Ошибка {response.status_code}"
+                return result
+
+            self.metrics.observe('rss_fetch_bytes', len(content), mirror=mirror)
+            # Байт-в-байт одинаковое тело не парсим повторно
+            content_hash = hashlib.sha1(content).hexdigest()
+            if content_hash == cached.get('content_hash'):
+                self.metrics.inc('rss_fetch_responses_total', mirror=mirror, result='unchanged')
+                self.source_health.record(source_url, 'success', latency)
+                result['not_modified'] = True
+                result['status'] = "♻️ Без изменений"
+                return result
+
+            result['latency'] = latency
+            result['validators'] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_hash': content_hash
+            }
+            watermark = self.seen_filter.get_watermark(channel_name)
+            if not parse:
+                result['body'] = content
+                result['watermark'] = watermark
+                result['status'] = f"📥 {len(content) / 1024:.0f} КБ"
+                return result
+            if cancel and cancel.is_set():
+                result['status'] = "⏹️ Отменен: ответило другое зеркало"
+                return result
+
+            with self.metrics.timer('rss_parse_seconds', mirror=mirror):
+                if self.stream_parse:
+                    # Разбор до первого поста, который уже есть в БД
+                    entries, seen_items, reached_known = read_new_entries(content, watermark)
                 else:
-                    print(f"❌ Ошибка {response.status_code}")
-                    
-            except Exception as e:
-                print(f"❌ {str(e)[:50]}...")
-                continue
+                    entries = feedparser.parse(response.text).entries
+                    seen_items, reached_known = len(entries), False
+
+            # Хост зеркала нужен разбору дат: формат запоминается по нему
+            for entry in entries:
+                entry['source_host'] = mirror
+            result['entries'] = entries
+            self.record_parsed(result, len(entries), seen_items, reached_known)
+            return result
+
+        except Exception as e:
+            self.metrics.inc('rss_fetch_responses_total', mirror=source_url.split('/')[2], result='error')
+            self.source_health.record(source_url, 'failure')
+            result['status'] = f"❌ {str(e)[:50]}..."
+            return result
+
+    def record_parsed(self, result: dict, new_items: int, seen_items: int, reached_known: bool):
+        """Итог разбора ответа зеркала: статус, здоровье, валидаторы только для непустых фидов"""
+        source_url = result['source']
+        mirror = source_url.split('/')[2]
+        result['reached_known'] = reached_known
+        if seen_items > 0:
+            self.metrics.inc('rss_fetch_responses_total', mirror=mirror, result='ok')
+            self.source_health.record(source_url, 'success', result['latency'])
+            if reached_known:
+                result['status'] = f"✅ {new_items} новых записей"
+            else:
+                result['status'] = f"✅ {new_items} записей"
+        else:
+            self.metrics.inc('rss_fetch_responses_total', mirror=mirror, result='empty')
+            self.source_health.record(source_url, 'empty', result['latency'])
+            result['validators'] = None
+            result['status'] = "❌ Пустой фид"
+
+    def remember_validators(self, channel_name: str, results: list):
+        """Запоминание валидаторов из использованных ответов зеркал"""
+        with self.validators_lock:
+            for result in results:
+                if result['validators']:
+                    key = (channel_name, result['source'])
+                    self.validators[key] = result['validators']
+                    self.dirty_validators.add(key)
+
+    def commit_validators(self, channel_name: str, stored: bool):
+        """Отложенные валидаторы канала: в кэш, только если посты записаны в БД
+
+        При ошибке записи они отбрасываются: иначе следующий цикл получил бы
+        304 или тот же хеш и пропустил незаписанные посты.
+        """
+        with self.validators_lock:
+            results = self.pending_validators.pop(channel_name, [])
+        if stored:
+            self.remember_validators(channel_name, results)
+
+    def record_latency(self, source_url: str, latency: float):
+        """Замер латентности ответа зеркала"""
+        with self.source_latencies_lock:
+            if source_url not in self.source_latencies:
+                self.source_latencies[source_url] = deque(maxlen=self.hedging['max_samples'])
+            self.source_latencies[source_url].append(latency)
+
+    def get_latency_quantile(self, source_url: str) -> float:
+        """Квантиль латентности зеркала или None, если замеров нет"""
+        with self.source_latencies_lock:
+            samples = sorted(self.source_latencies.get(source_url, ()))
+        if not samples:
+            return None
+        index = min(int(len(samples) * self.hedging['quantile']), len(samples) - 1)
+        return samples[index]
+
+    def warm_seen_filter(self):
+        """Прогрев фильтра последними сохраненными post_id"""
+        try:
+            with self.db_lock, self.conn as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT post_id FROM posts ORDER BY id DESC LIMIT ?',
+                    (self.seen_filter.capacity,)
+                )
+                post_ids = [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"⚠️ Ошибка при прогреве фильтра постов: {e}")
+            return
+        self.seen_filter.warm(reversed(post_ids))
+
+    def get_newest_post_id(self, channel_name: str) -> int:
+        """Самый новый сохраненный post_id канала"""
+        try:
+            with self.db_lock, self.conn as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT MAX(CAST(post_id AS INTEGER)) FROM posts WHERE channel = ?',
+                    (channel_name,)
+                )
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"⚠️ Ошибка при чтении последнего поста: {e}")
+            return None
+
+    def get_channel_interval(self, channel_name: str) -> float:
+        """Интервал опроса канала по медианному промежутку между его постами"""
+        intervals = self.config['check_intervals']
+        try:
+            with self.db_lock, self.conn as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT published_date FROM posts
+                    WHERE channel = ?
+                    ORDER BY id DESC
+                    LIMIT ?
+                ''', (channel_name, intervals['rate_window']))
+                dates = [parse_stored_date(row[0]) for row in cursor.fetchall()]
+                dates = sorted(date for date in dates if date)
+        except sqlite3.Error as e:
+            print(f"⚠️ Ошибка при оценке частоты постов {channel_name}: {e}")
+            return intervals['max']
+
+        gaps = [(later - earlier).total_seconds() for earlier, later in zip(dates, dates[1:])]
+        if not gaps:
+            return intervals['max']
+        interval = statistics.median(gaps) * intervals['rate_factor']
+        return min(max(interval, intervals['min']), intervals['max'])
+
+    def covers_newest(self, entries: list, newest_post_id: int) -> bool:
+        """Фид не оставляет пропуска до последнего известного поста"""
+        if not entries:
+            return False
+        if newest_post_id is None:
+            return True
+        post_ids = [entry.link.split('/')[-1] for entry in entries]
+        numeric_ids = [int(post_id) for post_id in post_ids if post_id.isdigit()]
+        return bool(numeric_ids) and min(numeric_ids) <= newest_post_id
+
+    def fetch_channel_hedged(self, channel_name: str) -> list:
+        """Опрос зеркал с хеджированием: до первого фида, покрывающего последний пост"""
+        # Сначала самые быстрые по замерам, зеркала без замеров и
+        # с разомкнутой цепью - в конце
+        sources = self.rss_sources
+        order = sorted(
+            range(len(sources)),
+            key=lambda index: (
+                self.source_health.is_open(sources[index]),
+                self.get_latency_quantile(sources[index]) or float('inf')
+            )
+        )
+        newest_post_id = self.seen_filter.get_watermark(channel_name)
+        results = [None] * len(sources)
+        pending = {}
+        winner = None
+        cancel = threading.Event()
+
+        while order or pending:
+            if order and winner is None:
+                index = order.pop(0)
+                source_url = sources[index]
+                future = self.hedge_fetch_executor.submit(
+                    self.fetch_source, channel_name, source_url, cancel=cancel
+                )
+                pending[future] = index
+                hedge_delay = self.get_latency_quantile(source_url) or self.hedging['default_delay']
+            else:
+                hedge_delay = None
+
+            # Ждем ответа не дольше задержки хеджа, затем запускаем запасное зеркало
+            done, _ = wait(pending, timeout=hedge_delay if order else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                result = results[index] = future.result()
+                # Неизменившийся фид тоже полный ответ: новых постов там нет
+                if winner is None and (result['not_modified'] or result['reached_known'] or
+                                       self.covers_newest(result['entries'], newest_post_id)):
+                    winner = index
+
+            if winner is not None:
+                # Остальные зеркала больше не нужны: начатые запросы
+                # бросают ответ до чтения тела и разбора
+                cancel.set()
+                for future in pending:
+                    future.cancel()
+                host = results[winner]['url'].split('/')[2]
+                results[winner]['status'] += f" ⚡ первым ({host})"
+                break
+
+        return [result for result in results if result is not None]
+
+    def report_channel(self, channel_name: str, results: list, unique_entries: int):
+        """Итоги канала по зеркалам - событие channel для приемников метрик"""
+        if unique_entries:
+            outcome = 'entries'
+        elif any(result.get('not_modified') for result in results):
+            outcome = 'not_modified'
+        elif any(result.get('reached_known') for result in results):
+            outcome = 'no_new'
+        else:
+            outcome = 'failed'
+        self.metrics.event(
+            'channel',
+            channel=channel_name,
+            mirrors=[{'mirror': result['url'].split('/')[2], 'status': result['status']} for result in results],
+            unique_entries=unique_entries,
+            outcome=outcome
+        )
+
+    def merge_feed_results(self, channel_name: str, results: list) -> dict:
+        """Итоги по зеркалам (событие channel для приемников) и объединение записей без дубликатов"""
+        all_entries = []
+        for result in results:
+            all_entries.extend(result['entries'])
 
         if all_entries:
             unique_entries = {}
@@ -174,109 +1241,150 @@ class TelegramRSSParser:
                 if post_id not in unique_entries:
                     unique_entries[post_id] = entry
 
-            print(f"\n📊 Итого уникальных записей: {len(unique_entries)}")
-            feed = type('obj', (object,), {'entries': list(unique_entries.values())})
+            self.report_channel(channel_name, results, len(unique_entries))
+            # Валидаторы запоминаются в parse_feed после успешной записи постов
+            with self.validators_lock:
+                self.pending_validators[channel_name] = results
+            feed = type('obj', (object,), {'entries': list(unique_entries.values()), 'channel': channel_name})
             return feed
 
-        print("\n❌ Не удалось получить данные")
+        # Записывать нечего - валидаторы можно запомнить сразу
+        self.remember_validators(channel_name, results)
+        self.report_channel(channel_name, results, 0)
         return None
 
+    def ingest_hedged(self, channel_name: str, last_check_time: datetime = None) -> int:
+        """Хеджированный канал: запись постов сразу после ответа первого зеркала, не дожидаясь цикла"""
+        feed = self.merge_feed_results(channel_name, self.fetch_channel_hedged(channel_name))
+        return self.parse_feed(feed, last_check_time) if feed else 0
+
+    def ingest_channels(self, channels: list, last_check_times: dict) -> dict:
+        """Загрузка и запись каналов цикла; возвращает число новых постов по каналам"""
+        hedge_futures = {
+            channel: self.hedge_executor.submit(self.ingest_hedged, channel, last_check_times.get(channel))
+            for channel in channels if channel in self.hedged_channels
+        }
+        regular = [channel for channel in channels if channel not in self.hedged_channels]
+        feeds = self.fetch_channels(regular)
+        new_posts = {
+            channel: self.parse_feed(feeds[channel], last_check_times.get(channel)) if feeds[channel] else 0
+            for channel in regular
+        }
+        for channel, future in hedge_futures.items():
+            new_posts[channel] = future.result()
+        return new_posts
+
+    def fetch_channels(self, channels: list) -> dict:
+        """Параллельная загрузка всех зеркал для списка каналов"""
+        hedged = [channel for channel in channels if channel in self.hedged_channels]
+        regular = [channel for channel in channels if channel not in self.hedged_channels]
+
+        hedge_futures = {
+            self.hedge_executor.submit(self.fetch_channel_hedged, channel): channel
+            for channel in hedged
+        }
+        # Зеркала по убыванию оценки здоровья
+        sources = self.source_health.order(self.rss_sources)
+        results = {channel: [None] * len(sources) for channel in regular}
+        futures = {
+            self.executor.submit(self.fetch_source, channel, source_url): (channel, index)
+            for channel in regular
+            for index, source_url in enumerate(sources)
+        }
+
+        for future in as_completed(futures):
+            channel, index = futures[future]
+            results[channel][index] = future.result()
+        for future, channel in hedge_futures.items():
+            results[channel] = future.result()
+
+        # При дубликатах побеждает зеркало с лучшей оценкой
+        return {
+            channel: self.merge_feed_results(channel, results[channel])
+            for channel in channels
+        }
+
+    def get_feed_data(self, channel_name: str) -> dict:
+        """Получение данных RSS из всех источников"""
+        return self.fetch_channels([channel_name])[channel_name]
+
     def save_post(self, post_data: Dict[str, Any]) -> bool:
+        return bool(self.save_posts([post_data]))
+
+    def save_posts(self, posts: list) -> list:
+        """Вставка пачки постов одной транзакцией, возвращает реально добавленные (None - ошибка БД)"""
+        if not posts:
+            return []
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.db_lock, self.metrics.timer('rss_db_write_seconds'), self.conn as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
+                cursor.execute('SELECT COALESCE(MAX(id), 0) FROM posts')
+                last_id = cursor.fetchone()[0]
+                cursor.executemany('''
                     INSERT OR IGNORE INTO posts 
-                    (post_id, content, published_date, source_url)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    post_data['post_id'],
-                    post_data['content'],
-                    post_data['published_date'],
-                    post_data['source_url']
-                ))
-                if cursor.rowcount > 0:
-                    self.save_to_txt(post_data)
-                    return True
-                return False
+                    (post_id, content, published_date, source_url, channel, cleanup_version)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [
+                    (
+                        post_data['post_id'],
+                        post_data['content'],
+                        post_data['published_date'],
+                        post_data['source_url'],
+                        channel_from_url(post_data['source_url']),
+                        self.text_cleaner.version
+                    )
+                    for post_data in posts
+                ])
+
+                inserted = posts
+                if cursor.rowcount != len(posts):
+                    # Часть строк проигнорирована: новые id идут после last_id
+                    cursor.execute('SELECT post_id FROM posts WHERE id > ?', (last_id,))
+                    inserted_ids = {row[0] for row in cursor.fetchall()}
+                    inserted = [post for post in posts if post['post_id'] in inserted_ids]
         except sqlite3.Error as e:
             print(f"⚠️ Ошибка при сохранении в БД: {e}")
-            return False
+            return None
+
+        self.metrics.inc('rss_posts_total', len(inserted), result='new')
+        if len(inserted) < len(posts):
+            self.metrics.inc('rss_posts_total', len(posts) - len(inserted), result='known')
+        now = datetime.now(timezone.utc)
+        for post_data in inserted:
+            self.seen_filter.add(channel_from_url(post_data['source_url']), [post_data['post_id']])
+            # Задержка от публикации до записи (created_at - published_date)
+            published = post_data['published_date']
+            if not isinstance(published, datetime):
+                published = parse_stored_date(str(published))
+            if published:
+                self.metrics.observe('rss_ingest_lag_seconds', max((now - published).total_seconds(), 0))
+
+        # Подписчикам - сразу после коммита, до выгрузки в текстовый файл
+        self.alerts.publish(inserted, channel_from_url)
+
+        # Текстовый файл пишем после коммита, не удерживая БД
+        if inserted:
+            self.save_posts_to_txt(inserted)
+        return inserted
 
     def save_to_txt(self, post_data: Dict[str, Any]):
         """Сохранение поста в текстовый файл с сортировкой"""
-        try:
-            # Читаем существующие записи
-            entries = []
-            if os.path.exists('tg-posts.txt'):
-                with open('tg-posts.txt', 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    raw_entries = content.split('\n\n')
-                    for entry in raw_entries:
-                        if entry.strip() and not entry.startswith('='): 
-                            entries.append(entry.strip())
-
-            # Добавляем новую запись
-            new_entry = f"[{post_data['published_date']}] {post_data['content']}\nИсточник: {post_data['source_url']}"
-            entries.append(new_entry)
-
-            # Сортируем записи по дате
-            def extract_date(entry):
-                try:
-                    date_str = entry[1:entry.find(']')]
-                    # Приводим все даты к naive datetime для корректного сравнения
-                    dt = datetime.fromisoformat(date_str)
-                    if dt.tzinfo:
-                        dt = dt.replace(tzinfo=None)
-                    return dt
-                except:
-                    return datetime.min
-            
-            entries.sort(key=extract_date, reverse=True)
+        self.save_posts_to_txt([post_data])
 
-            # Записываем отсортированные записи
-            with open('tg-posts.txt', 'w', encoding='utf-8') as f:
-                f.write('\n\n'.join(entries))
-            
-            # Обновляем сводку
+    def save_posts_to_txt(self, posts: list):
+        """Выгрузка пачки постов в текстовый файл и обновление сводки"""
+        try:
+            self.txt_writer.add(posts)
             self.update_txt_summary()
-                
         except Exception as e:
             print(f"⚠️ Ошибка при сохранении в файл: {e}")
 
-    def parse_date(self, date_str: str) -> datetime:
-        """Улучшенный парсинг даты с поддержкой разных форматов"""
+    def parse_date(self, date_str: str, host: str = None, parsed_struct=None) -> datetime:
+        """Парсинг даты: запомненный формат зеркала, быстрые пути, затем strptime"""
         try:
-            # Список поддерживаемых форматов дат
-            date_formats = [
-                '%a, %d %b %Y %H:%M:%S %Z',     # Thu, 21 Nov 2024 09:02:50 GMT
-                '%a, %d %b %Y %H:%M:%S %z',     # Thu, 21 Nov 2024 09:02:50 +0000
-                '%Y-%m-%dT%H:%M:%S.%fZ',        # 2024-11-21T09:02:50.000Z
-                '%Y-%m-%dT%H:%M:%SZ',           # 2024-11-21T09:02:50Z
-                '%Y-%m-%d %H:%M:%S',            # 2024-11-21 09:02:50
-            ]
-
-            # Предварительная обработка строки даты
-            date_str = date_str.strip()
-            
-            # Пробуем каждый формат
-            for date_format in date_formats:
-                try:
-                    # Для форматов с временной зоной
-                    if '%Z' in date_format:
-                        # Заменяем GMT на +0000 для корректного парсинга
-                        if 'GMT' in date_str:
-                            date_str = date_str.replace('GMT', '+0000')
-                        parsed_date = datetime.strptime(date_str, date_format)
-                        return parsed_date.replace(tzinfo=timezone.utc)
-                    else:
-                        parsed_date = datetime.strptime(date_str, date_format)
-                        # Добавляем UTC для дат без временной зоны
-                        if not parsed_date.tzinfo:
-                            parsed_date = parsed_date.replace(tzinfo=timezone.utc)
-                        return parsed_date
-                except ValueError:
-                    continue
+            parsed_date = self.date_parser.parse(date_str, host, parsed_struct)
+            if parsed_date:
+                return parsed_date
 
             # Если не удалось распарсить, логируем и возвращаем текущее время
             print(f"📅 Не удалось распарсить дату '{date_str}', используем текущее время")
@@ -289,7 +1397,7 @@ class TelegramRSSParser:
     def check_duplicate(self, post_id: str) -> bool:
         """Проверка на существование поста в БД"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.db_lock, self.conn as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT id FROM posts WHERE post_id = ?', (post_id,))
                 return cursor.fetchone() is not None
@@ -297,47 +1405,110 @@ class TelegramRSSParser:
             print(f"Ошибка при проверке дубликата: {e}")
             return False
 
+    def find_existing_post_ids(self, post_ids: list) -> set:
+        """Какие из post_id уже есть в БД - один запрос на пачку"""
+        existing = set()
+        try:
+            with self.db_lock, self.conn as conn:
+                cursor = conn.cursor()
+                # Ограничение SQLite на число параметров в запросе
+                for start in range(0, len(post_ids), 500):
+                    chunk = post_ids[start:start + 500]
+                    cursor.execute(
+                        f"SELECT post_id FROM posts WHERE post_id IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    )
+                    existing.update(row[0] for row in cursor.fetchall())
+        except sqlite3.Error as e:
+            print(f"Ошибка при проверке дубликатов: {e}")
+        return existing
+
+    def select_unseen(self, links: dict) -> set:
+        """post_id (из словаря post_id -> ссылка), которых еще нет в БД
+
+        Известные посты отсекает фильтр в памяти, остальные проверяются
+        одним запросом к БД.
+        """
+        candidates = set()
+        unknown = []
+        for post_id, link in links.items():
+            state = self.seen_filter.check(channel_from_url(link), post_id)
+            if state == 'seen':
+                continue
+            candidates.add(post_id)
+            if state == 'unknown':
+                unknown.append(post_id)
+
+        existing = self.find_existing_post_ids(unknown) if unknown else set()
+        for post_id in existing:
+            self.seen_filter.add(channel_from_url(links[post_id]), [post_id])
+        unseen = candidates - existing
+        if len(links) > len(unseen):
+            self.metrics.inc('rss_posts_total', len(links) - len(unseen), result='known')
+        return unseen
+
+    def save_parsed_posts(self, posts: list, last_check_time: datetime = None) -> int:
+        """Сохранение уже очищенных постов (из конвейера), которых еще нет в БД; None - ошибка БД"""
+        unique = {}
+        for post_data in posts:
+            unique.setdefault(post_data['post_id'], post_data)
+        new_ids = self.select_unseen({post_id: post_data['source_url'] for post_id, post_data in unique.items()})
+        fresh = [
+            post_data for post_id, post_data in unique.items()
+            if post_id in new_ids and not (last_check_time and post_data['published_date'] <= last_check_time)
+        ]
+        inserted = self.save_posts(fresh)
+        return None if inserted is None else len(inserted)
+
     def parse_feed(self, feed: dict, last_check_time: datetime = None) -> int:
         try:
-            new_posts = 0
-            existing_posts = 0
-            
+            # Кандидаты фида без повторов
+            entries = {}
             for entry in feed.entries:
+                entries.setdefault(entry.link.split('/')[-1], entry)
+            new_ids = self.select_unseen({post_id: entry.link for post_id, entry in entries.items()})
+
+            posts = []
+            clean_time = 0.0
+            for post_id, entry in entries.items():
+                if post_id not in new_ids:
+                    continue
                 try:
-                    post_id = entry.link.split('/')[-1]
-                    
-                    if self.check_duplicate(post_id):
-                        existing_posts += 1
-                        continue
-                    
+                    started = time.perf_counter()
                     content = self.clean_text(entry.description)
-                    published_date = self.parse_date(entry.published)
+                    clean_time += time.perf_counter() - started
+                    published_date = self.parse_date(
+                        entry.get('published', ''),
+                        entry.get('source_host'),
+                        entry.get('published_parsed')
+                    )
                     
                     if last_check_time and published_date <= last_check_time:
                         continue
                     
-                    post_data = {
+                    posts.append({
                         'post_id': post_id,
                         'content': content,
                         'published_date': published_date,
                         'source_url': entry.link
-                    }
-                    
-                    if self.save_post(post_data):
-                        new_posts += 1
+                    })
                     
                 except Exception as e:
                     print(f"⚠️ Ошибка обработки поста {post_id}: {e}")
                     continue
+            self.metrics.observe('rss_clean_seconds', clean_time)
             
-            return new_posts
+            inserted = self.save_posts(posts)
+            self.commit_validators(getattr(feed, 'channel', None), stored=inserted is not None)
+            return len(inserted or [])
             
         except Exception as e:
             print(f"❌ Ошибка парсинга: {e}")
+            self.commit_validators(getattr(feed, 'channel', None), stored=False)
             return 0
 
     def get_latest_posts(self, limit: int = 10) -> list:
-        with sqlite3.connect(self.db_name) as conn:
+        with self.db_lock, self.conn as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT post_id, content, published_date
@@ -350,11 +1521,11 @@ class TelegramRSSParser:
     def get_db_stats(self) -> dict:
         """Получение статистики базы данных"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.db_lock, self.conn as conn:
                 cursor = conn.cursor()
                 
                 # Общее количество постов
-                cursor.execute('SELECT COUNT(*) FROM posts')
+                cursor.execute('SELECT COALESCE(SUM(post_count), 0) FROM channel_stats')
                 total_posts = cursor.fetchone()[0]
                 
                 # Последние посты
@@ -410,15 +1581,12 @@ class TelegramRSSParser:
     def get_posts_stats(self) -> dict:
         """олучение статистики по постам за последние дни"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.db_lock, self.conn as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT 
-                        DATE(published_date) as date,
-                        COUNT(*) as count
-                    FROM posts
-                    WHERE published_date >= DATE('now', '-7 days')
-                    GROUP BY DATE(published_date)
+                    SELECT date, post_count
+                    FROM daily_stats
+                    WHERE date >= DATE('now', '-7 days') AND post_count > 0
                     ORDER BY date DESC
                     LIMIT 7
                 ''')
@@ -427,50 +1595,54 @@ class TelegramRSSParser:
             print(f"⚠️ Ошибка при получении статистики: {e}")
             return {}
 
+    def get_source_health(self) -> list:
+        """Оценки зеркал, лучшие первыми"""
+        return self.source_health.report(self.rss_sources)
+
+    def print_source_health(self):
+        """Вывод здоровья зеркал в консоль"""
+        print("\n=== Здоровье зеркал ===")
+        for item in self.get_source_health():
+            source = item['source'].split('//')[-1][:50]
+            if not item['requests']:
+                print(f"❔ {source}: нет данных")
+                continue
+            icon, state = "✅", ""
+            if item['open_until']:
+                until = datetime.fromtimestamp(item['open_until']).strftime('%H:%M:%S')
+                icon, state = "⛔", f" | отключено до {until}"
+            latency = item['latency_ewma'] or 0
+            print(f"{icon} {source}: оценка {item['score']:.2f} | "
+                  f"успешно {item['success_rate']:.0%} | пустых {item['empty_rate']:.0%} | "
+                  f"латентность {latency:.2f} с | запросов {item['requests']}{state}")
+
     def print_cycle_stats(self, new_posts: int):
-        """Вывод статистики после цикла проверки"""
-        if new_posts > 0:
-            print("\n📊 Статистика обновления:")
-            print(f"➕ Добавлено новых постов: {new_posts}")
-            
-            # Статистика по дням
-            stats = self.get_posts_stats()
-            if stats:
-                print("\n📅 Посты по датам:")
-                for date, count in stats.items():
-                    print(f"   {date}: {count:3d} постов")
-        else:
-            print("\n💤 Новых постов не обнаружено")
+        """Статистика после цикла проверки - событием cycle для приемников метрик"""
+        connections = self.get_connection_stats().values()
+        self.metrics.event(
+            'cycle',
+            new_posts=new_posts,
+            posts_by_date=self.get_posts_stats() if new_posts > 0 else {},
+            seen_filter=dict(self.seen_filter.stats),
+            requests=sum(host['requests'] for host in connections),
+            reused=sum(host['reused'] for host in connections)
+        )
 
     def generate_summary(self) -> str:
         """Генерация сводки по всем собранным данным"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.db_lock, self.conn as conn:
                 cursor = conn.cursor()
                 
-                # Общее количество постов
-                cursor.execute('SELECT COUNT(*) FROM posts')
-                total_posts = cursor.fetchone()[0]
-                
-                # Статистика по каналам с правильной группировкой
+                # Счетчики по каналам ведут триггеры, полный проход по posts не нужен
                 cursor.execute('''
-                    WITH channel_data AS (
-                        SELECT 
-                            CASE 
-                                WHEN source_url LIKE '%t.me/%' 
-                                THEN substr(source_url, instr(source_url, 't.me/') + 5)
-                                ELSE source_url
-                            END as full_channel
-                        FROM posts
-                    )
-                    SELECT 
-                        substr(full_channel, 1, instr(full_channel || '/', '/') - 1) as channel,
-                        COUNT(*) as count
-                    FROM channel_data
-                    GROUP BY substr(full_channel, 1, instr(full_channel || '/', '/') - 1)
-                    ORDER BY count DESC
+                    SELECT channel, post_count
+                    FROM channel_stats
+                    WHERE post_count > 0
+                    ORDER BY post_count DESC
                 ''')
                 channel_stats = cursor.fetchall()
+                total_posts = sum(count for _, count in channel_stats)
                 
                 # Формирум текст сводки
                 summary = [
@@ -500,82 +1672,137 @@ class TelegramRSSParser:
             return ""
 
     def update_txt_summary(self):
-        """Обновление сводки в конце файла"""
+        """Обновление сводки в отдельном файле"""
         try:
-            # Проверяем существование файла
-            if not os.path.exists('tg-posts.txt'):
-                with open('tg-posts.txt', 'w', encoding='utf-8') as f:
-                    f.write("")
-                    return
-
-            # Читаем файл
-            with open('tg-posts.txt', 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Оставляем только посты, удаляя все промежуточные статистики
-            posts = []
-            for entry in content.split('\n\n'):
-                # Пропускаем строки со статистикой
-                if any(skip in entry for skip in [
-                    "Всего собрано постов:",
-                    "Статистика по каналам:",
-                    "СВОДКА ПО СОБРАННЫМ ДАННЫМИ",
-                    "="*10
-                ]):
-                    continue
-                if entry.strip():
-                    posts.append(entry.strip())
-            
-            # Генерируем новую сводку
-            summary = self.generate_summary()
-            
-            # Записываем очищенный контент со сводкой
-            with open('tg-posts.txt', 'w', encoding='utf-8') as f:
-                if posts:
-                    f.write('\n\n'.join(posts) + summary)
-                else:
-                    f.write(summary)
-                
+            self.txt_writer.write_summary(self.generate_summary())
         except Exception as e:
             print(f"⚠️ Ошибка при обновлении сводки: {e}")
 
 def main():
-    parser = TelegramRSSParser()
-    intervals = parser.config.get('check_intervals', {})
-    check_interval = intervals.get('initial', 30)
-    last_check_times = {channel: None for channel in parser.channels}
+    arg_parser = argparse.ArgumentParser(description="RSS парсер Telegram-каналов")
+    arg_parser.add_argument('--health', action='store_true',
+                            help="показать здоровье зеркал и выйти")
+    arg_parser.add_argument('--worker-id',
+                            help="запуск воркером шарда: каналы делятся между живыми воркерами")
+    arg_parser.add_argument('--lease-db',
+                            help="файл таблицы аренды воркеров (по умолчанию из config.json)")
+    args = arg_parser.parse_args()
+
+    parser = TelegramRSSParser(worker_id=args.worker_id)
+    if args.health:
+        parser.print_source_health()
+        return
+    attach_sinks(parser.metrics, parser.config['metrics'])
+    alerts_config = parser.config['alerts']
+    alert_server = None
+    if alerts_config['sse_port']:
+        alert_server = AlertServer(parser.alerts, alerts_config['sse_port'], alerts_config['sse_host'])
+
+    shard = None
+    owned_channels = parser.channels
+    if args.worker_id:
+        sharding_config = parser.config['sharding']
+        if args.lease_db:
+            sharding_config['lease_db'] = args.lease_db
+        shard = ShardCoordinator(args.worker_id, sharding_config)
+        owned_channels = shard.refresh(parser.channels, [])
+        take_over_channels(parser, shard, owned_channels)
+        print(f"🧩 Воркер {args.worker_id}: {len(owned_channels)} из {len(parser.channels)} каналов")
+    scheduler = ChannelScheduler(owned_channels, parser.config['check_intervals'])
+    for channel in owned_channels:
+        scheduler.set_target(channel, parser.get_channel_interval(channel))
+    pipeline_config = parser.config['pipeline']
+    pipeline = None
+    if pipeline_config['enabled']:
+        pipeline = IngestPipeline(parser, pipeline_config['processes'], pipeline_config['queue_size'])
+    
+    try:
+        run_loop(parser, scheduler, pipeline, shard, owned_channels)
+    finally:
+        if pipeline:
+            pipeline.close()
+        if shard:
+            shard.release()
+        parser.metrics.close()
+        if alert_server:
+            alert_server.close()
+
+def run_cycle(parser: TelegramRSSParser, scheduler: ChannelScheduler, pipeline: IngestPipeline,
+              due_channels: list, last_check_times: dict):
+    """Один цикл: загрузка и разбор каналов, время проверки которых наступило"""
+    current_time = datetime.now(timezone.utc)
+    print(f"\n🕒 Проверка: {current_time.strftime('%Y-%m-%d %H:%M:%S UTC')} "
+          f"({len(due_channels)} из {len(scheduler.intervals)} каналов)")
     
+    total_new_posts = 0
+    if pipeline:
+        new_counts = pipeline.run(due_channels, last_check_times)
+    else:
+        new_counts = parser.ingest_channels(due_channels, last_check_times)
+    for channel in due_channels:
+        new_posts = new_counts[channel]
+        if new_posts > 0:
+            last_check_times[channel] = current_time
+            total_new_posts += new_posts
+            scheduler.set_target(channel, parser.get_channel_interval(channel))
+        scheduler.reschedule(channel, new_posts)
+
+    # На диск попадают только валидаторы каналов, посты которых записаны
+    parser.save_validators()
+    parser.source_health.save()
+    
+    # Выводим статистику после каждого цикла
+    parser.print_cycle_stats(total_new_posts)
+    if pipeline:
+        pipeline.print_stats()
+    parser.metrics.flush()
+
+def take_over_channels(parser: TelegramRSSParser, shard: ShardCoordinator, channels):
+    """Принятые каналы начинают с водяного знака прежнего владельца
+
+    Иначе все посты фида считались бы новыми: они записались бы повторно
+    и ушли подписчикам как свежие тревоги.
+    """
+    for channel, post_id in shard.handoff_watermarks(channels).items():
+        parser.seen_filter.seed(channel, post_id)
+
+def run_loop(parser: TelegramRSSParser, scheduler: ChannelScheduler, pipeline: IngestPipeline,
+             shard: ShardCoordinator, owned_channels: list):
+    """Основной цикл опроса каналов"""
+    intervals = parser.config['check_intervals']
+    last_check_times = {channel: None for channel in parser.channels}
     while True:
         try:
-            current_time = datetime.now(timezone.utc)
-            print(f"\n🕒 Проверка: {current_time.strftime('%Y-%m-%d %H:%M:%S UTC')}")
-            
-            total_new_posts = 0
-            for channel in parser.channels:
-                feed = parser.get_feed_data(channel)
-                if feed:
-                    new_posts = parser.parse_feed(feed, last_check_times[channel])
-                    if new_posts > 0:
-                        last_check_times[channel] = current_time
-                        total_new_posts += new_posts
-            
-            # Выводим статистику после каждого цикла
-            parser.print_cycle_stats(total_new_posts)
-            
-            # Корректируем интервал проверки согласно настройкам
-            if total_new_posts > 0:
-                check_interval = intervals.get('min', 15)
-            else:
-                check_interval = min(
-                    check_interval + intervals.get('increment', 5),
-                    intervals.get('max', 60)
-                )
+            if shard:
+                # Каналы умерших воркеров забираем, ушедшие к новым - отдаем
+                refreshed = shard.refresh(parser.channels, owned_channels)
+                if refreshed != owned_channels:
+                    for channel in set(owned_channels) - set(refreshed):
+                        scheduler.remove(channel)
+                    take_over_channels(parser, shard, set(refreshed) - set(owned_channels))
+                    for channel in set(refreshed) - set(owned_channels):
+                        scheduler.add(channel)
+                        scheduler.set_target(channel, parser.get_channel_interval(channel))
+                    print(f"🧩 Каналов у воркера: {len(owned_channels)} -> {len(refreshed)}")
+                    owned_channels = refreshed
+
+            due_channels = scheduler.pop_due()
+            if due_channels:
+                run_cycle(parser, scheduler, pipeline, due_channels, last_check_times)
+                if shard:
+                    shard.publish_watermarks({
+                        channel: parser.seen_filter.get_watermark(channel) for channel in due_channels
+                    })
                 
         except Exception as e:
             print(f"❌ Ошибк: {e}")
-            check_interval = intervals.get('max', 60)
+            scheduler.reschedule_missing(intervals['max'])
         
-        print(f"\n⏳ Следующая проверка через {check_interval} сек...")
+        check_interval, next_channel = scheduler.seconds_until_next()
+        print(f"\n⏳ Следующая проверка через {check_interval:.0f} сек ({next_channel})...")
+        if shard:
+            # Heartbeat аренды не должен пропускаться на время долгого ожидания
+            check_interval = min(check_interval, shard.seconds_until_heartbeat())
         time.sleep(check_interval)
 
 if __name__ == "__main__":
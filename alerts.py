@@ -0,0 +1,189 @@
+import json
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class AlertFilter:
+    """Фильтр подписки: каналы и ключевые слова (без учета регистра); пустой - всё"""
+
+    def __init__(self, channels: list = None, keywords: list = None):
+        self.channels = {channel.lower() for channel in channels or [] if channel}
+        self.keywords = [keyword.casefold() for keyword in keywords or [] if keyword]
+
+    def matches(self, event: dict) -> bool:
+        if self.channels and event['channel'].lower() not in self.channels:
+            return False
+        if self.keywords:
+            text = event['content'].casefold()
+            return any(keyword in text for keyword in self.keywords)
+        return True
+
+
+class Subscription:
+    def __init__(self, callback, alert_filter: AlertFilter):
+        self.callback = callback
+        self.filter = alert_filter
+        self.active = True
+
+
+class AlertBus:
+    """Рассылка новых постов подписчикам сразу после коммита в БД
+
+    Последние buffer_size событий хранятся в кольцевом буфере с номерами,
+    поэтому подписчик, подключившийся позже (или переподключившийся),
+    получает пропущенное начиная с известного ему номера. Номера событий
+    действуют в пределах одного запуска парсера.
+    """
+
+    def __init__(self, buffer_size: int = 1000, metrics=None):
+        self.buffer = deque(maxlen=buffer_size)
+        self.subscriptions = []
+        self.sequence = 0
+        self.metrics = metrics
+        # Публикация и подписка с догоном под одной блокировкой: без пропусков и повторов
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def make_event(sequence: int, post_data: dict, channel: str) -> dict:
+        published = post_data['published_date']
+        return {
+            'seq': sequence,
+            'channel': channel,
+            'post_id': post_data['post_id'],
+            'content': post_data['content'],
+            'published_date': published.isoformat() if isinstance(published, datetime) else str(published),
+            'source_url': post_data['source_url'],
+            'ingested_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    def publish(self, posts: list, channel_of):
+        """Новые посты (уже закоммиченные) - в буфер и подписчикам"""
+        if not posts:
+            return
+        with self.lock:
+            events = []
+            for post_data in posts:
+                self.sequence += 1
+                event = self.make_event(self.sequence, post_data, channel_of(post_data['source_url']))
+                self.buffer.append(event)
+                events.append(event)
+            for subscription in list(self.subscriptions):
+                for event in events:
+                    if subscription.active and subscription.filter.matches(event):
+                        self.deliver(subscription, event)
+
+    def deliver(self, subscription: Subscription, event: dict):
+        try:
+            subscription.callback(event)
+        except Exception as e:
+            print(f"⚠️ Ошибка подписчика оповещений: {e}")
+
+    def subscribe(self, callback, channels: list = None, keywords: list = None,
+                  since: int = None) -> Subscription:
+        """Подписка; since - номер последнего полученного события для догона из буфера"""
+        subscription = Subscription(callback, AlertFilter(channels, keywords))
+        with self.lock:
+            if since is not None:
+                for event in self.buffer:
+                    if event['seq'] > since and subscription.filter.matches(event):
+                        self.deliver(subscription, event)
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.active = False
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+
+class AlertServer:
+    """Поток Server-Sent Events: GET /events?channel=a,b&keyword=x&since=N
+
+    Переподключающийся клиент передает Last-Event-ID и получает пропущенное
+    из буфера. Клиент, не успевающий читать, отключается (и догоняет
+    при переподключении).
+    """
+
+    KEEPALIVE = 15
+    CLIENT_QUEUE = 256
+
+    def __init__(self, bus: AlertBus, port: int, host: str = '127.0.0.1'):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != '/events':
+                    self.send_error(404)
+                    return
+                server.stream(self, parse_qs(url.query))
+
+            def log_message(self, format, *args):
+                pass
+
+        self.bus = bus
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"🔔 Поток оповещений: http://{host}:{self.server.server_address[1]}/events")
+
+    @staticmethod
+    def split_param(params: dict, name: str) -> list:
+        return [value for item in params.get(name, []) for value in item.split(',') if value]
+
+    def stream(self, handler, params: dict):
+        since = handler.headers.get('Last-Event-ID') or (params.get('since') or [None])[0]
+        since = int(since) if since and since.isdigit() else None
+
+        events = queue.Queue(maxsize=self.CLIENT_QUEUE)
+        overflow = threading.Event()
+
+        def enqueue(event: dict):
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                overflow.set()
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        handler.close_connection = True
+
+        subscription = self.bus.subscribe(
+            enqueue, self.split_param(params, 'channel'), self.split_param(params, 'keyword'), since
+        )
+        try:
+            while not overflow.is_set():
+                try:
+                    event = events.get(timeout=self.KEEPALIVE)
+                except queue.Empty:
+                    handler.wfile.write(b': keepalive\n\n')
+                    handler.wfile.flush()
+                    continue
+                data = json.dumps(event, ensure_ascii=False)
+                handler.wfile.write(f"id: {event['seq']}\nevent: post\ndata: {data}\n\n".encode('utf-8'))
+                handler.wfile.flush()
+                if self.bus.metrics:
+                    ingested = datetime.fromisoformat(event['ingested_at'])
+                    self.bus.metrics.observe(
+                        'rss_alert_delivery_seconds',
+                        (datetime.now(timezone.utc) - ingested).total_seconds()
+                    )
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.bus.unsubscribe(subscription)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
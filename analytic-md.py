@@ -1,30 +1,450 @@
 import sqlite3
-from datetime import datetime, timedelta
+import hashlib
+import time
+from datetime import date, datetime, timedelta
 import pandas as pd
-import matplotlib.pyplot as plt
 from collections import Counter
 import re
 import seaborn as sns
-from wordcloud import WordCloud
 import numpy as np
 import os
+import argparse
+import heapq
+import json
+
+from channels import channel_from_url
+from charts import ChartRenderer
+
+POSTS_QUERY = """
+    SELECT 
+        id,
+        post_id,
+        content,
+        strftime('%Y-%m-%d %H:%M:%S', published_date) as published_date,
+        source_url,
+        strftime('%Y-%m-%d %H:%M:%S', created_at) as created_at
+    FROM posts
+"""
+
+# Минимальная длина слова для частотного словаря
+MIN_WORD_LENGTH = 4
+
+WORD_RE = re.compile(r'\w+')
+
+# Служебные слова, которые не несут смысла в частотном словаре (слова короче MIN_WORD_LENGTH отсекаются и так)
+RUSSIAN_STOPWORDS = {
+    'более', 'будет', 'будут', 'было', 'были', 'быть', 'вдруг', 'весь', 'всего', 'всех', 'всем', 'всеми', 'всей',
+    'даже', 'другой', 'если', 'есть', 'здесь', 'когда', 'которые', 'который', 'которая',
+    'которой', 'которых', 'куда', 'между', 'много', 'может', 'можно', 'надо', 'него', 'нему', 'нибудь',
+    'никогда', 'ничего', 'около', 'опять', 'очень', 'перед', 'после', 'потом', 'потому', 'почти',
+    'пока', 'почему', 'разве', 'свой', 'своей', 'свои', 'своих', 'себе', 'себя', 'сейчас', 'сегодня',
+    'снова', 'совсем', 'такой', 'также', 'тогда', 'того', 'тоже', 'только', 'теперь', 'чтобы', 'через',
+    'чего', 'чему', 'этим', 'этих', 'этой', 'этом', 'этот', 'этого', 'этому', 'этими', 'хорошо', 'иногда',
+    'нельзя', 'всегда', 'конечно', 'наконец', 'впрочем', 'хоть', 'какая', 'какой', 'какие', 'будто',
+}
+
+# Значения по умолчанию для секции analytics в config.json
+DEFAULT_ANALYTICS = {
+    'keywords': ['тревога', 'внимание', 'опасность', 'угроза', 'срочно' , 'fpv' , 'бпла' , 'Краснодар' , 'Краснодарский край'  , 'Ростов' , 'Ростовская область'],
+    'locations': {
+        # Области
+        'области': {
+            'Брянская область': ['Брянск', 'Стародуб', 'Климово', 'Навля'],
+            'Курская область': ['Курск', 'Обоянь'],
+            'Белгородская область': ['Белгород', 'Валуйки', 'Борисовка', 'Ясные Зори'],
+            'Ростовская область': ['Ростов', 'Таганрог'],
+            'Орловская область': ['Орёл'],
+            'Калужская область': ['Калуга'],
+            'Краснодарский край': ['Краснодар', 'Ейск', 'Славянск-на-Кубани', 'Крымск', 'Темрюк'],
+        },
+        # Отдельные территории
+        'территории': {
+            'ЛДНР': ['ДНР', 'ЛНР', 'Донецк', 'Горловка', 'Енакиево', 'Волноваха', 
+                    'Константиновка', 'Покровск', 'Любимовка'],
+            'Приазовье': ['Бердянск', 'Мариуполь'],
+        }
+    },
+    # Дополнительные стоп-слова к RUSSIAN_STOPWORDS
+    'stopwords': [],
+    # 0 - точный подсчет всех слов, N - только N самых частых (память ограничена)
+    'word_top_k': 0,
+    # Графики: процессов отрисовки (0 - по числу ядер), бэкенд matplotlib, кэш неизмененных графиков
+    'chart_processes': 0,
+    'chart_backend': 'Agg',
+    'chart_cache': True
+}
+
+
+def load_analytics_config(config_file: str = 'config.json') -> dict:
+    """Секция analytics из конфига парсера (или значения по умолчанию)"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f).get('analytics', {})
+    except Exception as e:
+        print(f"Ошибка загрузки конфигурации: {e}")
+        config = {}
+    return {**DEFAULT_ANALYTICS, **config}
+
+
+def location_names(locations: dict) -> list:
+    """Все регионы и города из секции locations"""
+    names = []
+    for category in locations.values():
+        for region, cities in category.items():
+            names.append(region)
+            names.extend(cities)
+    return names
+
+
+def trie_pattern(words) -> str:
+    """Регулярное выражение из префиксного дерева слов
+
+    re перебирает альтернативы по одной, а в дереве общий префикс
+    (Белгород / Белгородская область) проверяется один раз.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Подсчет упоминаний многих терминов за один проход по каждому посту
+
+    Все термины собраны в одно регулярное выражение (префиксное дерево)
+    с опережающей проверкой, поэтому находятся и пересекающиеся вхождения.
+    В каждой позиции берется самое длинное совпадение, а термины внутри
+    него (Краснодар в «Краснодарский край») засчитываются через таблицу
+    вложенности. Поиск без учета регистра, как str.contains(case=False).
+    """
+
+    def __init__(self, terms: list):
+        self.terms = list(dict.fromkeys(terms))
+        folded = {term.lower() for term in self.terms if term}
+        self.pattern = re.compile(f'(?=({trie_pattern(folded)}))') if folded else None
+        # Найденный термин -> все термины, которые в нем содержатся
+        self.covers = {term: [inner for inner in folded if inner in term] for term in folded}
+        self.originals = {}
+        for term in self.terms:
+            self.originals.setdefault(term.lower(), []).append(term)
+
+    def find(self, text: str) -> set:
+        """Термины (в нижнем регистре), которые встречаются в тексте"""
+        if not self.pattern or not text:
+            return set()
+        found = set()
+        for term in set(self.pattern.findall(text.lower())):
+            found.update(self.covers[term])
+        return found
+
+    def count(self, texts) -> Counter:
+        """Число текстов с упоминанием каждого термина"""
+        counts = Counter()
+        for text in texts:
+            counts.update(self.find(text))
+        return Counter({
+            original: counts[term]
+            for term, originals in self.originals.items()
+            for original in originals
+        })
+
+
+def count_series(counts, index_name: str, by_count: bool = False) -> pd.Series:
+    """Счетчики в Series с именованным индексом: одинаковый результат (и подпись оси) во всех режимах"""
+    series = pd.Series(counts, dtype='int64').sort_index()
+    if by_count:
+        series = series.sort_values(ascending=False, kind='stable')
+    return series.rename_axis(index_name)
+
+
+def median_from_counts(counts: Counter) -> float:
+    """Точная медиана по гистограмме значение -> количество"""
+    total = sum(counts.values())
+    if not total:
+        return float('nan')
+    middle = [(total - 1) // 2, total // 2]
+    values = []
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        while middle and middle[0] < seen:
+            values.append(value)
+            middle.pop(0)
+        if not middle:
+            break
+    return sum(values) / 2
+
+
+class WordCounter:
+    """Частоты слов по постам без склейки корпуса в одну строку
+
+    top_k = 0 - точный подсчет. При top_k > 0 хранится не больше 2 * top_k
+    слов (Space-Saving с пакетным вытеснением): после вытеснения редких слов
+    новое слово начинается с floor - наибольшего вытесненного счетчика.
+    Оценки частот завышены не больше чем на floor, а слова с частотой
+    выше floor не теряются.
+    """
+
+    def __init__(self, min_length: int = MIN_WORD_LENGTH, stopwords=(), top_k: int = 0):
+        self.min_length = min_length
+        self.stopwords = RUSSIAN_STOPWORDS | {word.lower() for word in stopwords}
+        self.top_k = top_k
+        self.counts = {}
+        self.floor = 0
+
+    def tokens(self, text: str):
+        for word in WORD_RE.findall(text.lower()):
+            if len(word) >= self.min_length and word not in self.stopwords:
+                yield word
+
+    def update(self, texts):
+        """Учет пачки постов: сначала точный счет по пачке, затем слияние"""
+        batch = Counter()
+        for text in texts:
+            batch.update(self.tokens(text))
+        self.add_counts(batch)
+
+    def add_counts(self, counts):
+        if not self.top_k:
+            for word, count in counts.items():
+                self.counts[word] = self.counts.get(word, 0) + count
+            return
+        for word, count in counts.items():
+            self.counts[word] = self.counts.get(word, self.floor) + count
+        if len(self.counts) > 2 * self.top_k:
+            self.prune()
+
+    def prune(self):
+        kept = heapq.nlargest(self.top_k, self.counts.items(), key=lambda item: item[1])
+        kept_words = {word for word, _ in kept}
+        evicted = [count for word, count in self.counts.items() if word not in kept_words]
+        self.floor = max([self.floor, *evicted])
+        self.counts = dict(kept)
+
+    def merge(self, other: 'WordCounter') -> 'WordCounter':
+        self.floor = max(self.floor, other.floor)
+        self.add_counts(other.counts)
+        return self
+
+    def most_common(self, n: int = None) -> list:
+        return Counter(self.counts).most_common(n)
+
+    def frequencies(self, min_length: int = None) -> Counter:
+        limit = self.top_k or None
+        return Counter(dict(
+            (word, count) for word, count in self.most_common(limit)
+            if len(word) >= (min_length or self.min_length)
+        ))
+
+
+class StreamingStats:
+    """Накопители метрик по частям таблицы posts
+
+    Каждая часть (DataFrame) учитывается в update(), накопители разных
+    частей объединяются через merge(). Размер состояния зависит от числа
+    каналов, дат, слов и различных длин постов, но не от числа постов.
+    """
+
+    def __init__(self, matcher: KeywordMatcher, words: WordCounter):
+        self.matcher = matcher
+        self.total = 0
+        self.last_id = 0
+        self.first_post = None
+        self.last_post = None
+        self.length_sum = 0
+        self.lengths = Counter()
+        self.channels = Counter()
+        self.hours = Counter()
+        self.dates = Counter()
+        self.response_seconds = Counter()
+        self.mentions = Counter()
+        self.words = words
+
+    def update(self, chunk: pd.DataFrame):
+        self.total += len(chunk)
+        if len(chunk):
+            self.last_id = max(self.last_id, int(chunk['id'].max()))
+        content = chunk['content'].fillna('')
+        published = pd.to_datetime(chunk['published_date'], format='%Y-%m-%d %H:%M:%S', utc=True)
+        created = pd.to_datetime(chunk['created_at'], format='%Y-%m-%d %H:%M:%S', utc=True)
+
+        channels = chunk['source_url'].fillna('').map(channel_from_url)
+        self.channels.update(channels.value_counts().to_dict())
+
+        lengths = content.str.len()
+        self.length_sum += int(lengths.sum())
+        self.lengths.update(lengths.value_counts().to_dict())
+
+        dated = published.dropna()
+        if not dated.empty:
+            self.hours.update(dated.dt.hour.value_counts().to_dict())
+            self.dates.update(dated.dt.date.value_counts().to_dict())
+            self.first_post = min(filter(None, [self.first_post, dated.min()]))
+            self.last_post = max(filter(None, [self.last_post, dated.max()]))
+
+        response = (created - published).dropna().dt.total_seconds().astype('int64')
+        self.response_seconds.update(response.value_counts().to_dict())
+
+        self.mentions.update(self.matcher.count(content))
+        self.words.update(content)
+
+    def merge(self, other: 'StreamingStats') -> 'StreamingStats':
+        self.total += other.total
+        self.last_id = max(self.last_id, other.last_id)
+        self.length_sum += other.length_sum
+        for name in ('lengths', 'channels', 'hours', 'dates', 'response_seconds', 'mentions'):
+            getattr(self, name).update(getattr(other, name))
+        self.words.merge(other.words)
+        self.first_post = min(filter(None, [self.first_post, other.first_post]), default=None)
+        self.last_post = max(filter(None, [self.last_post, other.last_post]), default=None)
+        return self
+
+
+class AggregateStore:
+    """Накопители StreamingStats в таблицах БД с водяным знаком по posts.id
+
+    analytics_counts хранит счетчики по ключам (канал, час, день, длина,
+    время реакции, термин, слово), analytics_state - итоги и id последнего
+    учтенного поста. Повторный запуск дочитывает только посты с большим id
+    и прибавляет их к сохраненным счетчикам. Смена ключевых слов или
+    локаций в конфиге сбрасывает агрегаты; после изменения текстов старых
+    постов (migratedb.py) нужен пересчет с --rebuild. В режиме word_top_k
+    частоты слов сохраняются целиком (не больше 2 * top_k строк).
+    """
+
+    # Счетчик StreamingStats -> разбор ключа из TEXT
+    COUNTERS = {
+        'channels': str,
+        'hours': int,
+        'dates': date.fromisoformat,
+        'lengths': int,
+        'response_seconds': int,
+        'mentions': str,
+    }
+
+    def __init__(self, conn, signature: str):
+        self.conn = conn
+        self.signature = signature
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS analytics_counts (
+                    metric TEXT,
+                    key TEXT,
+                    count INTEGER,
+                    PRIMARY KEY (metric, key)
+                ) WITHOUT ROWID
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS analytics_state (
+                    name TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM analytics_counts')
+            self.conn.execute('DELETE FROM analytics_state')
+
+    def load(self, stats: 'StreamingStats') -> 'StreamingStats':
+        """Сохраненные агрегаты в пустой stats (или сброс, если они от другого конфига)"""
+        state = dict(self.conn.execute('SELECT name, value FROM analytics_state'))
+        if state.get('signature') != self.signature:
+            if state:
+                print("🔄 Конфиг аналитики изменился: агрегаты пересчитываются заново")
+            self.reset()
+            return stats
+
+        stats.total = int(state['total'])
+        stats.last_id = int(state['last_id'])
+        stats.length_sum = int(state['length_sum'])
+        stats.first_post = pd.Timestamp(state['first_post']) if state.get('first_post') else None
+        stats.last_post = pd.Timestamp(state['last_post']) if state.get('last_post') else None
+        stats.words.floor = int(state.get('word_floor', 0))
+        for metric, key, count in self.conn.execute('SELECT metric, key, count FROM analytics_counts'):
+            if metric == 'words':
+                stats.words.counts[key] = count
+            else:
+                getattr(stats, metric)[self.COUNTERS[metric](key)] = count
+        return stats
+
+    def save(self, delta: 'StreamingStats', stats: 'StreamingStats'):
+        """Прибавление новых постов (delta) к таблицам и итоги (stats) - одной транзакцией"""
+        rows = [
+            (metric, str(key), count)
+            for metric in self.COUNTERS
+            for key, count in getattr(delta, metric).items()
+            if count
+        ]
+        words = stats.words if stats.words.top_k else delta.words
+        rows.extend(('words', word, count) for word, count in words.counts.items())
+        state = {
+            'signature': self.signature,
+            'total': stats.total,
+            'last_id': stats.last_id,
+            'length_sum': stats.length_sum,
+            'first_post': stats.first_post.isoformat() if stats.first_post else '',
+            'last_post': stats.last_post.isoformat() if stats.last_post else '',
+            'word_floor': stats.words.floor,
+        }
+        with self.conn:
+            if stats.words.top_k:
+                # Вытесненные слова удаляются, оставшиеся записываются заново
+                self.conn.execute("DELETE FROM analytics_counts WHERE metric = 'words'")
+            self.conn.executemany('''
+                INSERT INTO analytics_counts (metric, key, count) VALUES (?, ?, ?)
+                ON CONFLICT(metric, key) DO UPDATE SET count = count + excluded.count
+            ''', rows)
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO analytics_state (name, value) VALUES (?, ?)',
+                [(name, str(value)) for name, value in state.items()]
+            )
+
 
 class TelegramAnalyzer:
-    def __init__(self, db_path='tg-posts.db'):
+    def __init__(self, db_path='tg-posts.db', streaming=False, chunksize=10000, config=None,
+                 incremental=False, rebuild=False):
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
+        self.config = config or DEFAULT_ANALYTICS
+        self.matcher = KeywordMatcher(self.config['keywords'] + location_names(self.config['locations']))
+        self.mentions = None
+        self.stats = None
+
+        if incremental:
+            # Сохраненные агрегаты + посты, добавленные после прошлого запуска
+            self.df = None
+            store = AggregateStore(self.conn, self.config_signature())
+            if rebuild:
+                store.reset()
+            self.stats = store.load(self.new_stats())
+            started = time.perf_counter()
+            delta = self.read_stats(chunksize, self.stats.last_id)
+            self.stats.merge(delta)
+            store.save(delta, self.stats)
+            print(f"📥 Новых постов учтено: {delta.total} за {time.perf_counter() - started:.1f} с "
+                  f"(всего {self.stats.total}, последний id {self.stats.last_id})")
+            return
+
+        if streaming:
+            # Таблица читается частями, в памяти остаются только накопители
+            self.df = None
+            self.stats = self.read_stats(chunksize)
+            return
         
         # Читаем данные с явным указанием формата даты
-        self.df = pd.read_sql_query("""
-            SELECT 
-                id,
-                post_id,
-                content,
-                strftime('%Y-%m-%d %H:%M:%S', published_date) as published_date,
-                source_url,
-                strftime('%Y-%m-%d %H:%M:%S', created_at) as created_at
-            FROM posts
-        """, self.conn)
+        self.df = pd.read_sql_query(POSTS_QUERY, self.conn)
         
         # Конвертируем даты
         self.df['published_date'] = pd.to_datetime(self.df['published_date'])
@@ -34,11 +454,56 @@ class TelegramAnalyzer:
         self.df['published_date'] = self.df['published_date'].dt.tz_localize('UTC')
         self.df['created_at'] = self.df['created_at'].dt.tz_localize('UTC')
 
+    def read_stats(self, chunksize, after_id=0):
+        """Накопители по постам с id больше after_id, чтение частями"""
+        stats = self.new_stats()
+        query = POSTS_QUERY + " WHERE id > ? ORDER BY id"
+        for chunk in pd.read_sql_query(query, self.conn, params=(after_id,), chunksize=chunksize):
+            stats.update(chunk)
+        return stats
+
+    def new_word_counter(self, min_length=MIN_WORD_LENGTH):
+        return WordCounter(min_length, self.config['stopwords'], self.config['word_top_k'])
+
+    def new_stats(self):
+        return StreamingStats(self.matcher, self.new_word_counter())
+
+    def config_signature(self):
+        """Хеш терминов и параметров подсчета, от которых зависят агрегаты"""
+        settings = {
+            'terms': self.matcher.terms,
+            'min_word_length': MIN_WORD_LENGTH,
+            'stopwords': sorted(self.new_word_counter().stopwords),
+            'word_top_k': self.config['word_top_k'],
+        }
+        return hashlib.sha1(json.dumps(settings, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+    def post_count(self):
+        return self.stats.total if self.stats else len(self.df)
+
+    def mention_count(self, keyword):
+        """Число постов с упоминанием (без учета регистра)"""
+        if self.stats:
+            return self.stats.mentions[keyword]
+        if self.mentions is None:
+            # Все ключевые слова и локации за один проход по постам
+            self.mentions = self.matcher.count(self.df['content'].fillna(''))
+        return self.mentions[keyword]
+
     def basic_stats(self):
         """Базовая статистика по постам"""
+        if self.stats:
+            return {
+                'Всего постов': self.stats.total,
+                'Уникальных каналов': len(self.stats.channels),
+                'Первый пост': self.stats.first_post,
+                'Последний пост': self.stats.last_post,
+                'Средняя длина поста (символов)': self.stats.length_sum / self.stats.total if self.stats.total else float('nan'),
+                'Медианная длина поста': median_from_counts(self.stats.lengths),
+            }
         stats = {
             'Всего постов': len(self.df),
-            'Уникальных каналов': len(self.df['source_url'].unique()),
+            'Уникальных каналов': self.df['source_url'].fillna('').map(channel_from_url).nunique(),
             'Первый пост': self.df['published_date'].min(),
             'Последний пост': self.df['published_date'].max(),
             'Средняя длина поста (символов)': self.df['content'].str.len().mean(),
@@ -48,37 +513,57 @@ class TelegramAnalyzer:
 
     def posts_by_channel(self):
         """Распределение постов по каналам"""
-        channels = self.df['source_url'].apply(lambda x: x.split('/')[-1])
-        return channels.value_counts()
+        if self.stats:
+            return count_series(self.stats.channels, 'channel', by_count=True)
+        channels = self.df['source_url'].fillna('').map(channel_from_url)
+        return count_series(channels.value_counts(), 'channel', by_count=True)
 
     def posts_by_hour(self):
         """Распределение постов по часам"""
-        return self.df['published_date'].dt.hour.value_counts().sort_index()
+        if self.stats:
+            return count_series(self.stats.hours, 'published_date')
+        # Посты без даты не учитываются: иначе часы стали бы float (0.0 вместо 0)
+        hours = self.df['published_date'].dropna().dt.hour.astype('int64')
+        return count_series(hours.value_counts(), 'published_date')
 
     def posts_by_date(self):
         """Количество постов по датам"""
-        return self.df.groupby(self.df['published_date'].dt.date).size()
+        if self.stats:
+            return count_series(self.stats.dates, 'published_date')
+        return count_series(self.df['published_date'].dt.date.value_counts(), 'published_date')
 
     def word_frequency(self, min_length=4):
-        """Частота слов в постах"""
-        words = ' '.join(self.df['content']).lower()
-        words = re.findall(r'\b\w+\b', words)
-        return Counter([w for w in words if len(w) >= min_length])
+        """Частота слов в постах (без стоп-слов)"""
+        if self.stats:
+            return self.stats.words.frequencies(min_length)
+        words = self.new_word_counter(min_length)
+        words.update(self.df['content'].fillna(''))
+        return words.frequencies()
 
     def alert_keywords_analysis(self):
         """Анализ ключевых слов тревоги"""
-        keywords = ['тревога', 'внимание', 'опасность', 'угроза', 'срочно' , 'fpv' , 'бпла' , 'Краснодар' , 'Краснодарский край'  , 'Ростов' , 'Ростовская область']
         stats = {}
-        for keyword in keywords:
-            mask = self.df['content'].str.contains(keyword, case=False)
+        for keyword in self.config['keywords']:
+            mentions = self.mention_count(keyword)
             stats[keyword] = {
-                'total_mentions': mask.sum(),
-                'percentage': (mask.sum() / len(self.df)) * 100
+                'total_mentions': mentions,
+                'percentage': (mentions / self.post_count()) * 100
             }
         return stats
 
     def response_time_analysis(self):
         """Анализ времени между публикацией и сохранением"""
+        if self.stats:
+            seconds = self.stats.response_seconds
+            count = sum(seconds.values())
+            if not count:
+                return dict.fromkeys(['mean_response', 'median_response', 'min_response', 'max_response'], pd.NaT)
+            return {
+                'mean_response': pd.Timedelta(seconds=sum(value * n for value, n in seconds.items()) / count),
+                'median_response': pd.Timedelta(seconds=median_from_counts(seconds)),
+                'min_response': pd.Timedelta(seconds=min(seconds)),
+                'max_response': pd.Timedelta(seconds=max(seconds))
+            }
         self.df['response_time'] = (self.df['created_at'] - self.df['published_date'])
         return {
             'mean_response': self.df['response_time'].mean(),
@@ -89,89 +574,68 @@ class TelegramAnalyzer:
 
     def location_analysis(self):
         """Анализ упоминаний городов и областей"""
-        locations = {
-            # Области
-            'области': {
-                'Брянская область': ['Брянск', 'Стародуб', 'Климово', 'Навля'],
-                'Курская область': ['Курск', 'Обоянь'],
-                'Белгородская область': ['Белгород', 'Валуйки', 'Борисовка', 'Ясные Зори'],
-                'Ростовская область': ['Ростов', 'Таганрог'],
-                'Орловская область': ['Орёл'],
-                'Калужская область': ['Калуга'],
-                'Краснодарский край': ['Краснодар', 'Ейск', 'Славянск-на-Кубани', 'Крымск', 'Темрюк'],
-            },
-            # Отдельные территории
-            'территории': {
-                'ЛДНР': ['ДНР', 'ЛНР', 'Донецк', 'Горловка', 'Енакиево', 'Волноваха', 
-                        'Константиновка', 'Покровск', 'Любимовка'],
-                'Приазовье': ['Бердянск', 'Мариуполь'],
-            }
-        }
-        
         stats = {
             'области': {},
             'территории': {},
             'города': {}
         }
         
-        # Подсчет упоминаний областей и территорий
-        for category in ['области', 'территории']:
-            for region, cities in locations[category].items():
+        # Подсчет упоминаний по категориям из конфига (области, территории)
+        for category, regions in self.config['locations'].items():
+            stats.setdefault(category, {})
+            for region, cities in regions.items():
                 # Считаем упоминания региона
-                region_mask = self.df['content'].str.contains(region, case=False)
-                region_mentions = region_mask.sum()
+                region_mentions = self.mention_count(region)
                 
                 # Считаем упоминания городов региона
                 cities_mentions = {}
                 for city in cities:
-                    city_mask = self.df['content'].str.contains(city, case=False)
-                    city_mentions = city_mask.sum()
+                    city_mentions = self.mention_count(city)
                     if city_mentions > 0:
                         cities_mentions[city] = {
                             'total_mentions': city_mentions,
-                            'percentage': (city_mentions / len(self.df)) * 100
+                            'percentage': (city_mentions / self.post_count()) * 100
                         }
                 
                 if region_mentions > 0 or cities_mentions:
                     stats[category][region] = {
                         'total_mentions': region_mentions,
-                        'percentage': (region_mentions / len(self.df)) * 100,
+                        'percentage': (region_mentions / self.post_count()) * 100,
                         'cities': cities_mentions
                     }
         
         return stats
 
-    def generate_plots(self, output_dir='analytics'):
-        """Генерация графиков"""
-        import os
-        os.makedirs(output_dir, exist_ok=True)
+    def generate_plots(self, output_dir='analytics', cache=None):
+        """Генерация графиков (параллельно, с пропуском неизмененных)"""
+        def bar(series, title, figsize):
+            return 'bar', {
+                'labels': [str(label) for label in series.index],
+                'values': [int(value) for value in series.values],
+                'title': title,
+                'figsize': figsize,
+                'xlabel': series.index.name
+            }
 
-        # График постов по датам
-        plt.figure(figsize=(15, 5))
-        self.posts_by_date().plot(kind='bar')
-        plt.title('Посты по датам')
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/posts_by_date.png')
-        plt.close()
-
-        # График постов по часам
-        plt.figure(figsize=(10, 5))
-        self.posts_by_hour().plot(kind='bar')
-        plt.title('Распределение постов по часам')
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/posts_by_hour.png')
-        plt.close()
-
-        # Облако слов
-        wordcloud = WordCloud(width=1600, height=800, background_color='white').generate(
-            ' '.join(self.df['content'])
+        charts = {
+            'posts_by_date.png': bar(self.posts_by_date(), 'Посты по датам', [15, 5]),
+            'posts_by_hour.png': bar(self.posts_by_hour(), 'Распределение постов по часам', [10, 5]),
+            # WordCloud рисует не больше 200 самых частых слов (max_words); при равной
+            # частоте - по алфавиту, чтобы набор и хеш не зависели от режима чтения
+            'wordcloud.png': ('wordcloud', {
+                'frequencies': dict(sorted(self.word_frequency().items(), key=lambda item: (-item[1], item[0]))[:200]),
+                'width': 1600,
+                'height': 800,
+                'figsize': [20, 10]
+            }),
+        }
+        renderer = ChartRenderer(
+            output_dir,
+            processes=self.config['chart_processes'],
+            backend=self.config['chart_backend'],
+            cache=self.config['chart_cache'] if cache is None else cache
         )
-        plt.figure(figsize=(20,10))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('on')
-        plt.tight_layout(pad=0)
-        plt.savefig(f'{output_dir}/wordcloud.png')
-        plt.close()
+        return renderer.render(charts)
 
     def export_report(self, output_dir='analytics'):
         """Экспорт отчета в markdown в папку analytics"""
@@ -232,10 +696,24 @@ class TelegramAnalyzer:
         print(f"📊 Отчет сохранен в {output_file}")
 
 if __name__ == "__main__":
-    analyzer = TelegramAnalyzer()
+    arg_parser = argparse.ArgumentParser(description="Аналитика по базе постов")
+    arg_parser.add_argument('--db', default='tg-posts.db', help="файл БД")
+    arg_parser.add_argument('--stream', action='store_true',
+                            help="читать посты частями: память не растет с размером БД")
+    arg_parser.add_argument('--chunksize', type=int, default=10000, help="постов в одной части")
+    arg_parser.add_argument('--config', default='config.json', help="конфиг с секцией analytics")
+    arg_parser.add_argument('--incremental', action='store_true',
+                            help="хранить агрегаты в БД и учитывать только новые посты")
+    arg_parser.add_argument('--rebuild', action='store_true', help="пересчитать сохраненные агрегаты заново")
+    arg_parser.add_argument('--redraw', action='store_true', help="перерисовать графики, даже если данные не изменились")
+    args = arg_parser.parse_args()
+
+    analyzer = TelegramAnalyzer(args.db, streaming=args.stream, chunksize=args.chunksize,
+                                config=load_analytics_config(args.config),
+                                incremental=args.incremental or args.rebuild, rebuild=args.rebuild)
     
     # Генерируем все метрики и графики
-    analyzer.generate_plots()
+    analyzer.generate_plots(cache=False if args.redraw else None)
     analyzer.export_report()
     
     print("Анализ завершен! Проверьте папку 'analytics' для графиков и файл 'analytics_report.md' для отчета.")
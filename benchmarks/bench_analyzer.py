@@ -0,0 +1,73 @@
+"""Бенчмарк аналитики: вся таблица в DataFrame против потокового чтения частями
+
+Сравнивает время и пиковую память (tracemalloc) на синтетической БД
+и проверяет, что метрики совпадают.
+
+Запуск: python benchmarks/bench_analyzer.py [число постов] [размер части]
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fixtures import build_posts_db, load_analyzer
+
+
+def series_items(series) -> tuple:
+    """Имя и тип индекса, пары (метка, значение) - порядок и подписи осей тоже сравниваются"""
+    return series.index.name, str(series.index.dtype), list(series.items())
+
+
+def same_value(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9)
+    return a == b
+
+
+def measure(analyzer_class, db_path: str, **kwargs):
+    tracemalloc.start()
+    started = time.perf_counter()
+    analyzer = analyzer_class(db_path, **kwargs)
+    result = {
+        'stats': analyzer.basic_stats(),
+        'channels': series_items(analyzer.posts_by_channel()),
+        'dates': series_items(analyzer.posts_by_date()),
+        'hours': series_items(analyzer.posts_by_hour()),
+        'keywords': analyzer.alert_keywords_analysis(),
+        'locations': analyzer.location_analysis(),
+        'response': analyzer.response_time_analysis(),
+        'words': analyzer.word_frequency().most_common(50),
+    }
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    analyzer.conn.close()
+    return result, elapsed, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    chunksize = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    analytics = load_analyzer()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_posts_db(os.path.join(tmp, 'tg-posts.db'), count)
+        full, full_time, full_peak = measure(analytics.TelegramAnalyzer, db_path)
+        stream, stream_time, stream_peak = measure(
+            analytics.TelegramAnalyzer, db_path, streaming=True, chunksize=chunksize
+        )
+
+    same = all(full[key] == stream[key] for key in full if key != 'stats')
+    same = same and full['stats'].keys() == stream['stats'].keys() and all(
+        same_value(full['stats'][key], stream['stats'][key]) for key in full['stats']
+    )
+    print(f"Постов: {count}, часть: {chunksize}")
+    print(f"DataFrame:  {full_time:.2f} с, пик памяти {full_peak / 2 ** 20:.1f} МБ")
+    print(f"Потоковый:  {stream_time:.2f} с, пик памяти {stream_peak / 2 ** 20:.1f} МБ")
+    print(f"Метрики совпадают: {'да' if same else 'нет'}")
+
+
+if __name__ == "__main__":
+    main()
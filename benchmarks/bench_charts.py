@@ -0,0 +1,50 @@
+"""Бенчмарк отрисовки графиков: последовательно против пула процессов и кэша
+
+Данные - потоковая аналитика синтетической БД. Сравниваются три запуска
+generate_plots: в одном процессе без кэша (как раньше), в пуле процессов
+без кэша и повторный запуск с кэшем при неизменных данных.
+
+Запуск: python benchmarks/bench_charts.py [число постов]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from fixtures import build_posts_db, load_analyzer
+
+
+def timed_plots(analyzer, output_dir: str, cache: bool) -> float:
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.generate_plots(output_dir, cache=cache)
+    return time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    analytics = load_analyzer()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_posts_db(os.path.join(tmp, 'tg-posts.db'), count)
+        analyzer = analytics.TelegramAnalyzer(db_path, streaming=True)
+
+        analyzer.config = {**analyzer.config, 'chart_processes': 1}
+        sequential = timed_plots(analyzer, os.path.join(tmp, 'sequential'), cache=False)
+
+        analyzer.config = {**analyzer.config, 'chart_processes': 3}
+        output_dir = os.path.join(tmp, 'pool')
+        pool = timed_plots(analyzer, output_dir, cache=False)
+        cached = timed_plots(analyzer, output_dir, cache=True)
+        analyzer.conn.close()
+
+    print(f"Постов: {count}, ядер: {os.cpu_count()}")
+    print(f"Последовательно:  {sequential:.2f} с")
+    print(f"Пул процессов:    {pool:.2f} с ({sequential / pool:.1f}x)")
+    print(f"Повтор из кэша:   {cached:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Бенчмарк очистки текста: прежний clean_text против TextCleaner
+
+Корпус - тексты постов из примера БД, обернутые в разметку виджета
+Telegram так, как её отдают зеркала (теги, сущности, forwarded-заголовки).
+
+Запуск: python benchmarks/bench_clean.py [повторов корпуса]
+"""
+import html
+import json
+import re
+import sys
+import time
+
+from fixtures import ROOT_DIR, load_sample_texts, telegram_html
+
+from textcleanup import TextCleaner
+
+
+def legacy_clean_text(text: str, cleanup_config: dict) -> str:
+    """Прежняя реализация TelegramRSSParser.clean_text"""
+    remove_phrases = cleanup_config.get('remove_phrases', [])
+    remove_patterns = cleanup_config.get('remove_patterns', [])
+
+    text = text.replace('<br>', '\n')
+    text = text.replace('<br/>', '\n')
+    text = text.replace('<p>', '\n')
+    text = text.replace('</p>', '\n')
+
+    if 'Forwarded From' in text:
+        text = text.split('</b>')[-1].strip()
+
+    if '<div class="tgme_widget_message_text' in text:
+        text = text.split('dir="auto">')[-1]
+        text = text.split('</div>')[0]
+
+    text = re.sub('<[^<]+?>', '', text)
+
+    for phrase in remove_phrases:
+        text = text.replace(phrase, '')
+
+    for pattern in remove_patterns:
+        text = re.sub(pattern, '', text)
+
+    text = html.unescape(text)
+
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not any(phrase in line for phrase in remove_phrases):
+            lines.append(line)
+
+    text = '\n'.join(lines)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    return text.strip()
+
+
+def build_corpus(repeat: int) -> list:
+    texts = load_sample_texts(limit=2000)
+    corpus = []
+    for index, text in enumerate(texts):
+        corpus.append(telegram_html(text, forwarded=(index % 5 == 0)))
+        corpus.append(f'<p>{html.escape(text)}</p><p>Поддержать канал / наш чат https://t.me/chat/1</p>')
+    return corpus * repeat
+
+
+def measure(clean, corpus: list) -> tuple:
+    started = time.perf_counter()
+    results = [clean(text) for text in corpus]
+    return time.perf_counter() - started, results
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with open(f'{ROOT_DIR}/config.json', encoding='utf-8') as f:
+        cleanup_config = json.load(f).get('text_cleanup', {})
+    corpus = build_corpus(repeat)
+    size_mb = sum(len(text.encode('utf-8')) for text in corpus) / 1024 / 1024
+
+    before, legacy_results = measure(lambda text: legacy_clean_text(text, cleanup_config), corpus)
+    cleaner = TextCleaner(cleanup_config)
+    after, results = measure(cleaner.clean, corpus)
+
+    mismatches = sum(1 for old, new in zip(legacy_results, results) if old != new)
+    print(f"Постов: {len(corpus)} ({size_mb:.1f} МБ HTML)")
+    print(f"До:    {before:.2f} с, {len(corpus) / before:,.0f} постов/с, {size_mb / before:.1f} МБ/с")
+    print(f"После: {after:.2f} с, {len(corpus) / after:,.0f} постов/с, {size_mb / after:.1f} МБ/с")
+    print(f"Ускорение: {before / after:.1f}x, расхождений с прежним результатом: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
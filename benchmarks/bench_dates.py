@@ -0,0 +1,85 @@
+"""Бенчмарк разбора дат: прежний перебор strptime против DateParser
+
+Образцы - даты в форматах разных зеркал (RFC 822 с GMT и смещением,
+ISO с миллисекундами и без, дата без зоны). Каждое зеркало отдает
+даты в одном формате, как в реальных фидах.
+
+Запуск: python benchmarks/bench_dates.py [дат на зеркало]
+"""
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from fixtures import ROOT_DIR  # noqa: F401 - добавляет корень репозитория в sys.path
+
+from dateparse import DateParser
+
+MIRROR_FORMATS = {
+    'tg.i-c-a.su': lambda date: format_datetime(date, usegmt=True),
+    'rsshub.app': lambda date: format_datetime(date.astimezone(timezone(timedelta(hours=3)))),
+    'ru-element.ru': lambda date: date.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+    'telegram.meta.ua': lambda date: date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    'localhost': lambda date: date.strftime('%Y-%m-%d %H:%M:%S'),
+}
+
+
+def legacy_parse_date(date_str: str) -> datetime:
+    """Прежняя реализация TelegramRSSParser.parse_date"""
+    date_formats = [
+        '%a, %d %b %Y %H:%M:%S %Z',
+        '%a, %d %b %Y %H:%M:%S %z',
+        '%Y-%m-%dT%H:%M:%S.%fZ',
+        '%Y-%m-%dT%H:%M:%SZ',
+        '%Y-%m-%d %H:%M:%S',
+    ]
+    date_str = date_str.strip()
+    for date_format in date_formats:
+        try:
+            if '%Z' in date_format:
+                if 'GMT' in date_str:
+                    date_str = date_str.replace('GMT', '+0000')
+                parsed_date = datetime.strptime(date_str, date_format)
+                return parsed_date.replace(tzinfo=timezone.utc)
+            parsed_date = datetime.strptime(date_str, date_format)
+            if not parsed_date.tzinfo:
+                parsed_date = parsed_date.replace(tzinfo=timezone.utc)
+            return parsed_date
+        except ValueError:
+            continue
+    return datetime.now(timezone.utc)
+
+
+def build_samples(per_mirror: int) -> list:
+    start = datetime(2024, 11, 23, 12, 0, tzinfo=timezone.utc)
+    samples = []
+    for offset in range(per_mirror):
+        date = start - timedelta(minutes=offset * 7, seconds=offset % 60)
+        for host, formatter in MIRROR_FORMATS.items():
+            samples.append((formatter(date), host))
+    return samples
+
+
+def main():
+    per_mirror = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    samples = build_samples(per_mirror)
+
+    started = time.perf_counter()
+    legacy_results = [legacy_parse_date(date_str) for date_str, _ in samples]
+    before = time.perf_counter() - started
+
+    parser = DateParser()
+    started = time.perf_counter()
+    results = [parser.parse(date_str, host) for date_str, host in samples]
+    after = time.perf_counter() - started
+
+    mismatches = sum(1 for old, new in zip(legacy_results, results) if old != new)
+    print(f"Дат: {len(samples)} ({len(MIRROR_FORMATS)} форматов)")
+    print(f"До:    {before:.2f} с, {len(samples) / before:,.0f} дат/с")
+    print(f"После: {after:.2f} с, {len(samples) / after:,.0f} дат/с")
+    print(f"Ускорение: {before / after:.1f}x, расхождений по времени: {mismatches}")
+    print(f"Форматы зеркал: {parser.host_formats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Микробенчмарк вставки постов: соединение на каждый пост против общего WAL-соединения
+
+Запуск: python benchmarks/bench_db_insert.py [число постов]
+"""
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from fixtures import load_sample_texts
+
+from Rsspars import TelegramRSSParser
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS posts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id TEXT UNIQUE,
+        content TEXT,
+        published_date TIMESTAMP,
+        source_url TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def make_posts(count: int) -> list:
+    texts = load_sample_texts()
+    start = datetime(2024, 11, 23, tzinfo=timezone.utc)
+    return [
+        {
+            'post_id': str(100000 + i),
+            'content': texts[i % len(texts)],
+            'published_date': start + timedelta(seconds=i),
+            'source_url': f'https://t.me/bench/{100000 + i}'
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_insert(db_name: str, posts: list) -> float:
+    """Прежняя схема: проверка дубликата и вставка, каждая в новом соединении"""
+    with sqlite3.connect(db_name) as conn:
+        conn.execute(SCHEMA)
+    started = time.perf_counter()
+    for post in posts:
+        with sqlite3.connect(db_name) as conn:
+            if conn.execute('SELECT id FROM posts WHERE post_id = ?',
+                            (post['post_id'],)).fetchone():
+                continue
+        with sqlite3.connect(db_name) as conn:
+            conn.execute('''
+                INSERT OR IGNORE INTO posts
+                (post_id, content, published_date, source_url)
+                VALUES (?, ?, ?, ?)
+            ''', (post['post_id'], post['content'], post['published_date'], post['source_url']))
+    return time.perf_counter() - started
+
+
+def parser_insert(db_name: str, posts: list) -> float:
+    """Текущая схема: методы парсера поверх общего соединения"""
+    run_dir = os.path.dirname(db_name)
+    config_file = os.path.join(run_dir, 'config.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'channels': [],
+            'txt_export': {
+                'path': os.path.join(run_dir, 'tg-posts.txt'),
+                'summary_path': os.path.join(run_dir, 'tg-posts-summary.txt')
+            }
+        }, f)
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = TelegramRSSParser(db_name=db_name, config_file=config_file)
+    # Замеряем только БД, без выгрузки в tg-posts.txt
+    parser.save_posts_to_txt = lambda posts: None
+    started = time.perf_counter()
+    for post in posts:
+        if not parser.check_duplicate(post['post_id']):
+            parser.save_post(post)
+    elapsed = time.perf_counter() - started
+    parser.close()
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    posts = make_posts(count)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        before = legacy_insert(os.path.join(tmp_dir, 'legacy.db'), posts)
+        after = parser_insert(os.path.join(tmp_dir, 'parser.db'), posts)
+
+    print(f"Постов: {count}")
+    print(f"До  (соединение на запрос): {before:.2f} с, {count / before:,.0f} постов/с")
+    print(f"После (общее WAL-соединение): {after:.2f} с, {count / after:,.0f} постов/с")
+    print(f"Ускорение: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Бенчмарк разбора фида: feedparser целиком против потокового разбора до известного поста
+
+Фид канала из N записей, из которых новых - только несколько последних
+(обычная ситуация между двумя проверками). Замеряются время и пиковая
+память разбора одного ответа зеркала.
+
+Запуск: python benchmarks/bench_feed_parse.py [записей в фиде] [новых записей]
+"""
+import sys
+import time
+import tracemalloc
+
+import feedparser
+
+from fixtures import build_rss
+
+from feedstream import read_new_entries
+
+
+def measure(parse, body: bytes, rounds: int) -> tuple:
+    tracemalloc.start()
+    parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        entries = parse(body)
+    return (time.perf_counter() - started) / rounds, peak, len(entries)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    new = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    start_id = 1000
+    body = build_rss('krd_radar', count=count, start_id=start_id)
+    # В БД уже есть всё, кроме new самых свежих постов
+    watermark = start_id + count - new
+
+    rounds = 20
+    before, before_peak, before_count = measure(
+        lambda data: feedparser.parse(data).entries, body, rounds)
+    after, after_peak, after_count = measure(
+        lambda data: read_new_entries(data, watermark)[0], body, rounds)
+
+    print(f"Фид: {count} записей, {len(body) / 1024:.0f} КБ, новых: {new}")
+    print(f"feedparser:  {before * 1000:.1f} мс, пик памяти {before_peak / 1024:.0f} КБ, записей {before_count}")
+    print(f"Потоковый:   {after * 1000:.1f} мс, пик памяти {after_peak / 1024:.0f} КБ, записей {after_count}")
+    print(f"Ускорение: {before / after:.1f}x, память: {before_peak / after_peak:.1f}x меньше")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Бенчмарк цикла загрузки: последовательный обход против параллельного
+
+Запуск: python benchmarks/bench_fetch.py
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import ExitStack
+
+from fixtures import StubMirror
+
+from Rsspars import TelegramRSSParser
+
+MIRROR_DELAYS = [0.05, 0.1, 0.15, 0.2, 0.3, 0.5]
+CHANNEL_COUNTS = [1, 3, 6, 12]
+MIRROR_COUNTS = [2, 4, 6]
+
+
+def make_parser(tmp_dir: str, max_workers: int, per_host_limit: int) -> TelegramRSSParser:
+    config_file = os.path.join(tmp_dir, f'config-{max_workers}.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'channels': [],
+            'fetch': {
+                'timeout': 10,
+                'max_workers': max_workers,
+                'per_host_limit': per_host_limit
+            },
+            'txt_export': {
+                'path': os.path.join(tmp_dir, f'tg-posts-{max_workers}.txt'),
+                'summary_path': os.path.join(tmp_dir, f'tg-posts-summary-{max_workers}.txt')
+            }
+        }, f)
+    return TelegramRSSParser(
+        db_name=os.path.join(tmp_dir, 'bench.db'),
+        config_file=config_file
+    )
+
+
+def run_cycle(parser: TelegramRSSParser, channels: list) -> float:
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser.fetch_channels(channels)
+    return time.perf_counter() - started
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir, ExitStack() as stack:
+        mirrors = [stack.enter_context(StubMirror(delay)) for delay in MIRROR_DELAYS]
+        sequential = make_parser(tmp_dir, max_workers=1, per_host_limit=1)
+        concurrent = make_parser(tmp_dir, max_workers=16, per_host_limit=4)
+
+        print(f"{'каналов':>8} {'зеркал':>7} {'последовательно, с':>20} {'параллельно, с':>16} {'ускорение':>10}")
+        for mirror_count in MIRROR_COUNTS:
+            sources = [mirror.source_url for mirror in mirrors[-mirror_count:]]
+            sequential.rss_sources = sources
+            concurrent.rss_sources = sources
+            for channel_count in CHANNEL_COUNTS:
+                channels = [f'channel{i}' for i in range(channel_count)]
+                seq_time = run_cycle(sequential, channels)
+                con_time = run_cycle(concurrent, channels)
+                print(f"{channel_count:>8} {mirror_count:>7} {seq_time:>20.2f} "
+                      f"{con_time:>16.2f} {seq_time / con_time:>9.1f}x")
+
+        print("\nПереиспользование соединений (параллельный режим):")
+        for host, stats in concurrent.get_connection_stats().items():
+            if stats['requests']:
+                print(f"  {host}: запросов {stats['requests']}, "
+                      f"новых соединений {stats['connections']}, "
+                      f"переиспользовано {stats['reused']}")
+
+
+if __name__ == "__main__":
+    main()
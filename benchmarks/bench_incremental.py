@@ -0,0 +1,64 @@
+"""Бенчмарк инкрементальной аналитики: полный пересчет против сохраненных агрегатов
+
+На синтетической БД первый запуск с incremental=True строит агрегаты,
+затем в БД дописываются посты за сутки (480 при посте раз в 3 минуты),
+и повторный запуск учитывает только их. Результат сверяется с полным
+потоковым пересчетом.
+
+Запуск: python benchmarks/bench_incremental.py [число постов] [новых постов]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from fixtures import build_posts_db, load_analyzer
+
+
+def report(analyzer) -> dict:
+    return {
+        'stats': analyzer.basic_stats(),
+        'channels': analyzer.posts_by_channel().to_dict(),
+        'hours': analyzer.posts_by_hour().to_dict(),
+        'dates': analyzer.posts_by_date().to_dict(),
+        'keywords': analyzer.alert_keywords_analysis(),
+        'locations': analyzer.location_analysis(),
+        'response': analyzer.response_time_analysis(),
+        'words': analyzer.word_frequency(),
+    }
+
+
+def timed(analyzer_class, db_path: str, **kwargs):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer = analyzer_class(db_path, **kwargs)
+        result = report(analyzer)
+    analyzer.conn.close()
+    return result, time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    new_posts = int(sys.argv[2]) if len(sys.argv) > 2 else 480
+    analytics = load_analyzer()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_posts_db(os.path.join(tmp, 'tg-posts.db'), count)
+        _, initial = timed(analytics.TelegramAnalyzer, db_path, incremental=True)
+
+        build_posts_db(db_path, new_posts, start=count)
+        full, full_time = timed(analytics.TelegramAnalyzer, db_path, streaming=True)
+        incremental, incremental_time = timed(analytics.TelegramAnalyzer, db_path, incremental=True)
+
+    print(f"Постов: {count} + {new_posts} новых")
+    print(f"Первый запуск (построение агрегатов): {initial:.2f} с")
+    print(f"Полный пересчет:        {full_time:.2f} с")
+    print(f"Инкрементальный запуск: {incremental_time:.2f} с")
+    print(f"Ускорение: {full_time / incremental_time:.1f}x, "
+          f"результаты совпадают: {'да' if full == incremental else 'нет'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Бенчмарк подсчета упоминаний: str.contains на каждый термин против KeywordMatcher
+
+Термины - ключевые слова и локации из секции analytics. Прежний способ
+делал отдельный проход регулярным выражением по всем постам для каждого
+термина, KeywordMatcher проходит каждый пост один раз.
+
+Запуск: python benchmarks/bench_keywords.py [число постов]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from fixtures import load_analyzer, load_sample_texts
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    analytics = load_analyzer()
+    config = analytics.DEFAULT_ANALYTICS
+    terms = list(dict.fromkeys(config['keywords'] + analytics.location_names(config['locations'])))
+
+    texts = load_sample_texts()
+    content = pd.Series([texts[i % len(texts)] for i in range(count)])
+
+    started = time.perf_counter()
+    legacy = {term: int(content.str.contains(term, case=False).sum()) for term in terms}
+    before = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matcher = analytics.KeywordMatcher(terms)
+    counts = matcher.count(content)
+    after = time.perf_counter() - started
+
+    mismatches = [term for term in terms if legacy[term] != counts[term]]
+    print(f"Постов: {count}, терминов: {len(terms)}")
+    print(f"До:    {before:.2f} с ({len(terms)} проходов)")
+    print(f"После: {after:.2f} с (1 проход)")
+    print(f"Ускорение: {before / after:.1f}x, расхождений: {len(mismatches)} {mismatches or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Бенчмарк конвейера: потоки с разбором под GIL против пула процессов
+
+Каналы с фидами из постов примера БД отдаются локальным зеркалом; каждый
+прогон начинается с пустой БД, так что все посты новые и проходят разбор,
+очистку и запись.
+
+Запуск: python benchmarks/bench_pipeline.py [каналов] [записей в фиде]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from fixtures import StubMirror
+
+from Rsspars import TelegramRSSParser
+from pipeline import IngestPipeline
+
+PROCESS_COUNTS = [1, 2, 4]
+
+
+def make_parser(tmp_dir: str, name: str) -> TelegramRSSParser:
+    with open(os.path.join(os.path.dirname(__file__), '..', 'config.json'), encoding='utf-8') as f:
+        cleanup_config = json.load(f).get('text_cleanup', {})
+    run_dir = os.path.join(tmp_dir, name)
+    os.makedirs(run_dir)
+    config_file = os.path.join(run_dir, 'config.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'channels': [],
+            'fetch': {'max_workers': 16, 'per_host_limit': 8},
+            'txt_export': {
+                'path': os.path.join(run_dir, 'tg-posts.txt'),
+                'summary_path': os.path.join(run_dir, 'tg-posts-summary.txt')
+            },
+            'text_cleanup': cleanup_config
+        }, f)
+    return TelegramRSSParser(db_name=os.path.join(run_dir, 'bench.db'), config_file=config_file)
+
+
+def run_threads(parser: TelegramRSSParser, channels: list) -> int:
+    feeds = parser.fetch_channels(channels)
+    return sum(parser.parse_feed(feeds[channel]) for channel in channels if feeds[channel])
+
+
+def main():
+    channel_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    channels = [f'channel{i}' for i in range(channel_count)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            StubMirror(delay=0.02, items=items, unique_ids=True) as mirror:
+        print(f"Каналов: {channel_count}, записей в фиде: {items}, ядер: {os.cpu_count()}")
+
+        parser = make_parser(tmp_dir, 'threads')
+        parser.rss_sources = [mirror.source_url]
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            saved = run_threads(parser, channels)
+        baseline = time.perf_counter() - started
+        parser.close()
+        print(f"{'потоки':>12}: {baseline:6.2f} с, постов {saved}")
+
+        for processes in PROCESS_COUNTS:
+            parser = make_parser(tmp_dir, f'pipeline-{processes}')
+            parser.rss_sources = [mirror.source_url]
+            pipeline = IngestPipeline(parser, processes=processes, queue_size=16)
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                saved = sum(pipeline.run(channels).values())
+            elapsed = time.perf_counter() - started
+            pipeline.close()
+            parser.close()
+            print(f"{f'{processes} проц.':>12}: {elapsed:6.2f} с, постов {saved}, "
+                  f"ускорение {baseline / elapsed:.1f}x "
+                  f"(разбор {pipeline.stats['parse']:.2f} с, запись {pipeline.stats['write']:.2f} с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Бенчмарк частотного словаря: склейка корпуса в строку против WordCounter
+
+Посты собираются из словаря со ципфовским распределением частот
+(много редких слов, как в реальном архиве). Сравниваются время и пик
+памяти прежнего ' '.join + findall, точного WordCounter и режима top_k,
+а также совпадение top-100 у точного и приближенного подсчета.
+
+Запуск: python benchmarks/bench_words.py [число постов] [top_k] [размер словаря]
+"""
+import itertools
+import random
+import re
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from fixtures import load_analyzer
+
+
+def build_posts(count: int, vocabulary: int) -> list:
+    rng = random.Random(42)
+    words = [f"слово{index:06d}" for index in range(vocabulary)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    return [' '.join(rng.choices(words, cum_weights=cum_weights, k=25)) for _ in range(count)]
+
+
+def legacy_frequency(posts: list) -> Counter:
+    """Прежний word_frequency: весь корпус одной строкой"""
+    words = ' '.join(posts).lower()
+    words = re.findall(r'\b\w+\b', words)
+    return Counter([w for w in words if len(w) >= 4])
+
+
+def measure(function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def counted(analytics, posts: list, top_k: int, chunk: int = 10000):
+    counter = analytics.WordCounter(top_k=top_k)
+    for start in range(0, len(posts), chunk):
+        counter.update(posts[start:start + chunk])
+    return counter
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    vocabulary = int(sys.argv[3]) if len(sys.argv) > 3 else 500000
+    analytics = load_analyzer()
+    posts = build_posts(count, vocabulary)
+
+    legacy, legacy_time, legacy_peak = measure(lambda: legacy_frequency(posts))
+    exact, exact_time, exact_peak = measure(lambda: counted(analytics, posts, 0))
+    approx, approx_time, approx_peak = measure(lambda: counted(analytics, posts, top_k))
+
+    top_exact = [word for word, _ in exact.most_common(100)]
+    top_approx = [word for word, _ in approx.most_common(100)]
+    max_error = max(approx.counts[word] - exact.counts[word] for word in top_approx)
+    print(f"Постов: {count}, словарь: {vocabulary}, различных слов: {len(exact.counts)}")
+    print(f"Склейка корпуса:   {legacy_time:.2f} с, пик памяти {legacy_peak / 2 ** 20:.1f} МБ")
+    print(f"WordCounter:       {exact_time:.2f} с, пик памяти {exact_peak / 2 ** 20:.1f} МБ, "
+          f"совпадает с прежним: {'да' if Counter(exact.counts) == legacy else 'нет'}")
+    print(f"WordCounter top_k={top_k}: {approx_time:.2f} с, пик памяти {approx_peak / 2 ** 20:.1f} МБ, "
+          f"слов в памяти: {len(approx.counts)}")
+    print(f"top-100 совпадает: {len(set(top_exact) & set(top_approx))}/100, "
+          f"макс. завышение: {max_error} (floor {approx.floor})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Общие фикстуры для бенчмарков: RSS-фиды и локальный стаб-сервер зеркал"""
+import hashlib
+import html
+import importlib.util
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE_DB = os.path.join(ROOT_DIR, 'Examples', 'Output rss', 'tg-posts.db')
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+FALLBACK_TEXTS = [
+    "Крым запад\nВнимание по БПЛА",
+    "Внимание! На всей территории Херсонской области РФ. Опасность по БПЛА !",
+    "От Дмитровск Орловский 1 БПЛА в сторону Орла",
+    "Краснодарский край\nОтбой опасности",
+]
+
+
+def load_sample_texts(limit: int = 500) -> list:
+    """Тексты постов из примера БД (или встроенный набор, если её нет)"""
+    if not os.path.exists(EXAMPLE_DB):
+        return list(FALLBACK_TEXTS)
+    with sqlite3.connect(EXAMPLE_DB) as conn:
+        rows = conn.execute('SELECT content FROM posts LIMIT ?', (limit,)).fetchall()
+    return [row[0] for row in rows if row[0]] or list(FALLBACK_TEXTS)
+
+
+def telegram_html(text: str, forwarded: bool = False) -> str:
+    """Оборачивает текст в разметку виджета Telegram, как её отдают зеркала"""
+    body = html.escape(text).replace('\n', '<br/>')
+    body += '<br/><br/><a href="https://t.me/atypicaldayy31">🇷🇺 Приграничье - подписаться</a> @atypicaldayy31'
+    if forwarded:
+        body = f'<b>Forwarded From</b> <a href="https://t.me/source">Source</a></b>{body}'
+    return (
+        '<div class="tgme_widget_message_text js-message_text" dir="auto">'
+        f'{body}</div>'
+    )
+
+
+def build_rss(channel: str, count: int = 20, start_id: int = 1000,
+              texts: list = None) -> bytes:
+    """Генерация RSS 2.0 фида канала, новые записи первыми"""
+    texts = texts or load_sample_texts()
+    now = datetime(2024, 11, 23, 12, 0, tzinfo=timezone.utc)
+    items = []
+    for offset in range(count):
+        post_id = start_id + count - offset
+        text = texts[post_id % len(texts)]
+        published = now - timedelta(minutes=offset * 7)
+        description = telegram_html(text, forwarded=(post_id % 5 == 0))
+        items.append(
+            '<item>'
+            f'<title>{html.escape(text.splitlines()[0][:60])}</title>'
+            f'<link>https://t.me/{channel}/{post_id}</link>'
+            f'<description>{html.escape(description)}</description>'
+            f'<pubDate>{format_datetime(published)}</pubDate>'
+            '</item>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0"><channel>'
+        f'<title>{channel}</title><link>https://t.me/{channel}</link>'
+        f'{"".join(items)}'
+        '</channel></rss>'
+    ).encode('utf-8')
+
+
+def build_posts_db(path: str, count: int, channels: int = 20, start: int = 0) -> str:
+    """БД постов в схеме парсера из образцов текстов (для бенчмарков аналитики)
+
+    start - номер первого поста, чтобы дописывать новые посты в ту же БД.
+    """
+    texts = load_sample_texts()
+    first = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    with sqlite3.connect(path) as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                post_id TEXT UNIQUE,
+                content TEXT,
+                published_date TIMESTAMP,
+                source_url TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        rows = []
+        for i in range(start, start + count):
+            published = first + timedelta(minutes=i * 3)
+            rows.append((
+                str(i),
+                texts[i % len(texts)],
+                published.strftime('%Y-%m-%d %H:%M:%S'),
+                f'https://t.me/channel{i % channels}/{i}',
+                (published + timedelta(seconds=30 + i % 600)).strftime('%Y-%m-%d %H:%M:%S')
+            ))
+        conn.executemany(
+            'INSERT INTO posts (post_id, content, published_date, source_url, created_at) VALUES (?, ?, ?, ?, ?)',
+            rows
+        )
+    return path
+
+
+def load_analyzer():
+    """Модуль analytic-md.py (имя с дефисом не импортируется обычным import)"""
+    spec = importlib.util.spec_from_file_location('analytic_md', os.path.join(ROOT_DIR, 'analytic-md.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StubMirror:
+    """Локальное зеркало RSS с искусственной задержкой ответа"""
+
+    def __init__(self, delay: float = 0.1, items: int = 20, etag: bool = False,
+                 unique_ids: bool = False):
+        self.delay = delay
+        self.items = items
+        self.etag = etag
+        # post_id уникален в БД глобально: каналам нужны непересекающиеся номера
+        self.unique_ids = unique_ids
+        self.requests = 0
+        mirror = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                mirror.requests += 1
+                time.sleep(mirror.delay)
+                channel = self.path.rstrip('/').split('/')[-1].split('?')[0]
+                start_id = zlib.crc32(channel.encode()) % 10 ** 6 * 1000 if mirror.unique_ids else 1000
+                body = build_rss(channel, count=mirror.items, start_id=start_id)
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if mirror.etag and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                if mirror.etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/rss+xml; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def source_url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/rss/{{channel}}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,18 @@
+def channel_from_url(source_url: str) -> str:
+    """Имя канала из ссылки на пост вида https://t.me/<канал>/<id>"""
+    full_channel = source_url.split('t.me/', 1)[1] if 't.me/' in source_url else source_url
+    return full_channel.split('/')[0]
+
+
+# То же самое на SQL - для триггеров, поиска и заполнения старых записей
+CHANNEL_SQL = '''
+    substr(
+        CASE WHEN {url} LIKE '%t.me/%'
+             THEN substr({url}, instr({url}, 't.me/') + 5)
+             ELSE {url} END,
+        1,
+        instr(CASE WHEN {url} LIKE '%t.me/%'
+                   THEN substr({url}, instr({url}, 't.me/') + 5)
+                   ELSE {url} END || '/', '/') - 1
+    )
+'''
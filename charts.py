@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+# Версия оформления графиков: при изменении функций отрисовки кэш сбрасывается
+RENDER_VERSION = 1
+CACHE_FILE = '.charts-cache.json'
+
+
+def init_renderer(backend: str):
+    """Бэкенд matplotlib процесса отрисовки (Agg - без окон, быстрее всего для PNG)"""
+    if backend:
+        matplotlib.use(backend, force=True)
+
+
+def render_bar(path: str, labels: list, values: list, title: str, figsize: list, xlabel: str = None):
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    plt.figure(figsize=figsize)
+    pd.Series(values, index=pd.Index(labels, name=xlabel), dtype='int64').plot(kind='bar')
+    plt.title(title)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def render_wordcloud(path: str, frequencies: dict, width: int, height: int, figsize: list):
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+
+    wordcloud = WordCloud(width=width, height=height, background_color='white')
+    wordcloud.generate_from_frequencies(frequencies)
+    plt.figure(figsize=figsize)
+    plt.imshow(wordcloud, interpolation='bilinear')
+    plt.axis('on')
+    plt.tight_layout(pad=0)
+    plt.savefig(path)
+    plt.close()
+
+
+CHART_TYPES = {
+    'bar': render_bar,
+    'wordcloud': render_wordcloud,
+}
+
+
+def render_chart(kind: str, path: str, params: dict) -> float:
+    """Отрисовка одного графика (выполняется в процессе пула); возвращает время, сек"""
+    started = time.perf_counter()
+    CHART_TYPES[kind](path, **params)
+    return time.perf_counter() - started
+
+
+def chart_hash(kind: str, params: dict) -> str:
+    data = json.dumps({'version': RENDER_VERSION, 'kind': kind, 'params': params},
+                      sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class ChartRenderer:
+    """Отрисовка графиков в пуле процессов (один график - один процесс) с кэшем
+
+    Кэш - файл CACHE_FILE в папке графиков: хеш входных данных каждого
+    графика. Если данные не изменились и PNG на месте, график не
+    перерисовывается.
+    """
+
+    def __init__(self, output_dir: str, processes: int = 0, backend: str = 'Agg', cache: bool = True):
+        self.output_dir = output_dir
+        self.processes = processes or os.cpu_count() or 1
+        self.backend = backend
+        self.cache = cache
+        self.cache_path = os.path.join(output_dir, CACHE_FILE)
+
+    def load_cache(self) -> dict:
+        if not self.cache:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, hashes: dict):
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(hashes, f, ensure_ascii=False, indent=2)
+
+    def render(self, charts: dict) -> dict:
+        """charts: имя файла -> (тип, параметры); возвращает время отрисовки по графикам (None - из кэша)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        started = time.perf_counter()
+        cached = self.load_cache()
+        hashes = {name: chart_hash(kind, params) for name, (kind, params) in charts.items()}
+        pending = {
+            name: chart for name, chart in charts.items()
+            if cached.get(name) != hashes[name] or not os.path.exists(os.path.join(self.output_dir, name))
+        }
+
+        timings = {name: None for name in charts if name not in pending}
+        if len(pending) > 1 and self.processes > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(self.processes, len(pending)),
+                initializer=init_renderer,
+                initargs=(self.backend,)
+            ) as pool:
+                futures = {
+                    name: pool.submit(render_chart, kind, os.path.join(self.output_dir, name), params)
+                    for name, (kind, params) in pending.items()
+                }
+                for name, future in futures.items():
+                    try:
+                        timings[name] = future.result()
+                    except Exception as e:
+                        print(f"⚠️ Ошибка отрисовки {name}: {e}")
+        else:
+            init_renderer(self.backend)
+            for name, (kind, params) in pending.items():
+                try:
+                    timings[name] = render_chart(kind, os.path.join(self.output_dir, name), params)
+                except Exception as e:
+                    print(f"⚠️ Ошибка отрисовки {name}: {e}")
+
+        for name in charts:
+            if name in timings and timings[name] is None:
+                print(f"🖼️ {name}: без изменений (кэш)")
+            elif name in timings:
+                print(f"🖼️ {name}: {timings[name]:.2f} с")
+        print(f"🖼️ Графики готовы за {time.perf_counter() - started:.2f} с "
+              f"(отрисовано {len(pending)}, из кэша {len(charts) - len(pending)})")
+
+        # Неудачные графики в кэш не попадают и будут перерисованы в следующий раз
+        self.save_cache({name: hashes[name] for name in charts if name in timings})
+        return timings
@@ -0,0 +1,109 @@
+import calendar
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_stored_date(value: str) -> datetime:
+    """Дата из БД: ISO-формат или RFC 822 из старых записей, None если не удалось"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if not parsed.tzinfo:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def parse_rfc822(date_str: str) -> datetime:
+    # Thu, 21 Nov 2024 09:02:50 GMT / +0000
+    return parsedate_to_datetime(date_str)
+
+
+def parse_iso(date_str: str) -> datetime:
+    # 2024-11-21T09:02:50.000Z / 2024-11-21T09:02:50+03:00 / 2024-11-21 09:02:50
+    return datetime.fromisoformat(date_str)
+
+
+def strptime_parser(date_format: str):
+    def parse(date_str: str) -> datetime:
+        # strptime не понимает GMT как смещение
+        return datetime.strptime(date_str.replace('GMT', '+0000'), date_format)
+    return parse
+
+
+# Форматы в порядке проверки: быстрые разборщики, затем strptime
+DATE_PARSERS = {
+    'rfc822': parse_rfc822,
+    'iso': parse_iso,
+    'strptime_rfc822': strptime_parser('%a, %d %b %Y %H:%M:%S %z'),
+    'strptime_iso_ms': strptime_parser('%Y-%m-%dT%H:%M:%S.%fZ'),
+    'strptime_iso': strptime_parser('%Y-%m-%dT%H:%M:%SZ'),
+    'strptime_plain': strptime_parser('%Y-%m-%d %H:%M:%S'),
+}
+
+
+class DateParser:
+    """Разбор дат публикации с запоминанием формата для каждого зеркала
+
+    Зеркало отдает даты всегда в одном формате, поэтому сработавший
+    формат пробуется первым для следующих записей того же хоста.
+    """
+
+    def __init__(self):
+        self.host_formats = {}
+        self.lock = threading.Lock()
+        self.stats = {'memo_hits': 0, 'struct': 0, 'failed': 0}
+
+    def try_format(self, name: str, date_str: str) -> datetime:
+        try:
+            parsed_date = DATE_PARSERS[name](date_str)
+        except (TypeError, ValueError, IndexError):
+            return None
+        # Даты без временной зоны считаем UTC
+        if not parsed_date.tzinfo:
+            parsed_date = parsed_date.replace(tzinfo=timezone.utc)
+        return parsed_date
+
+    def parse(self, date_str: str, host: str = None, parsed_struct=None) -> datetime:
+        """Дата с временной зоной или None, если разобрать не удалось
+
+        parsed_struct - уже разобранный feedparser'ом published_parsed (UTC);
+        если он есть, строка не разбирается вовсе: calendar.timegm дешевле
+        parsedate_to_datetime. Дата при этом приводится к UTC (момент
+        времени тот же). Без него - запомненный формат зеркала, быстрые
+        пути и перебор strptime.
+        """
+        if parsed_struct:
+            self.stats['struct'] += 1
+            return datetime.fromtimestamp(calendar.timegm(parsed_struct), timezone.utc)
+
+        date_str = (date_str or '').strip()
+        if not date_str:
+            self.stats['failed'] += 1
+            return None
+
+        memo = self.host_formats.get(host)
+        if memo:
+            parsed_date = self.try_format(memo, date_str)
+            if parsed_date:
+                self.stats['memo_hits'] += 1
+                return parsed_date
+
+        for name in DATE_PARSERS:
+            if name != memo:
+                parsed_date = self.try_format(name, date_str)
+                if parsed_date:
+                    self.remember(host, name)
+                    return parsed_date
+
+        self.stats['failed'] += 1
+        return None
+
+    def remember(self, host: str, name: str):
+        if host:
+            with self.lock:
+                self.host_formats[host] = name
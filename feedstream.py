@@ -0,0 +1,86 @@
+from io import BytesIO
+import xml.etree.ElementTree as ET
+
+import feedparser
+
+# Теги записи и её полей в RSS 2.0 / RSS 1.0 / Atom (без пространств имен)
+ITEM_TAGS = ('item', 'entry')
+DESCRIPTION_TAGS = ('description', 'encoded', 'content', 'summary')
+PUBLISHED_TAGS = ('pubDate', 'published', 'date', 'updated')
+
+
+def local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def element_to_entry(item) -> feedparser.FeedParserDict:
+    """Запись фида с теми же полями, что отдает feedparser"""
+    fields = {}
+    link = None
+    for child in item:
+        name = local_name(child.tag)
+        if name == 'link':
+            # Atom: <link rel="alternate" href="..."/>, RSS: <link>...</link>
+            href = child.get('href')
+            if href is None:
+                link = link or (child.text or '').strip()
+            elif child.get('rel', 'alternate') == 'alternate':
+                link = link or href.strip()
+        elif name not in fields:
+            fields[name] = child.text or ''
+
+    entry = feedparser.FeedParserDict()
+    entry['link'] = link or fields.get('guid') or fields.get('id') or ''
+    entry['description'] = next((fields[tag] for tag in DESCRIPTION_TAGS if fields.get(tag)), '')
+    published = next((fields[tag] for tag in PUBLISHED_TAGS if fields.get(tag)), None)
+    if published:
+        entry['published'] = published.strip()
+    return entry
+
+
+def iter_entries(body: bytes):
+    """Ленивый разбор записей RSS/Atom по одной; ET.ParseError - если это не XML"""
+    for _, element in ET.iterparse(BytesIO(body), events=('end',)):
+        if local_name(element.tag) in ITEM_TAGS:
+            yield element_to_entry(element)
+            # Разобранная запись больше не нужна - освобождаем память
+            element.clear()
+
+
+def numeric_post_id(entry) -> int:
+    post_id = entry.get('link', '').rstrip('/').split('/')[-1]
+    return int(post_id) if post_id.isdigit() else None
+
+
+def read_new_entries(body: bytes, watermark: int = None) -> tuple:
+    """Записи фида новее водяного знака канала
+
+    Telegram-фиды идут от новых постов к старым, поэтому разбор
+    останавливается на первом посте с post_id <= watermark.
+    Возвращает (записи, сколько записей просмотрено, дошли ли до известного поста).
+    Если тело не разбирается как XML, используется feedparser целиком.
+    """
+    entries = []
+    seen_items = 0
+    try:
+        stream = iter_entries(body)
+        for entry in stream:
+            seen_items += 1
+            post_id = numeric_post_id(entry)
+            if watermark is not None and post_id is not None and post_id <= watermark:
+                stream.close()
+                return entries, seen_items, True
+            entries.append(entry)
+        return entries, seen_items, False
+    except ET.ParseError:
+        pass
+
+    # Невалидный XML (HTML-сущности, обрезанный ответ) - терпимый feedparser
+    entries = []
+    feed = feedparser.parse(body)
+    for seen_items, entry in enumerate(feed.entries, 1):
+        post_id = numeric_post_id(entry)
+        if watermark is not None and post_id is not None and post_id <= watermark:
+            return entries, seen_items, True
+        entries.append(entry)
+    return entries, len(feed.entries), False
@@ -0,0 +1,323 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Границы корзин гистограмм, сек (или байт для размеров ответов)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS = {
+    'rss_ingest_lag_seconds': (5, 15, 30, 60, 120, 300, 600, 1800, 3600, 3 * 3600, 24 * 3600),
+    'rss_fetch_bytes': (1024, 10 * 1024, 50 * 1024, 100 * 1024, 500 * 1024, 1024 * 1024, 5 * 1024 * 1024),
+}
+
+HELP = {
+    'rss_fetch_seconds': 'Латентность ответа зеркала',
+    'rss_fetch_bytes': 'Размер тела ответа зеркала',
+    'rss_fetch_responses_total': 'Ответы зеркал по результату',
+    'rss_parse_seconds': 'Разбор фида одного ответа',
+    'rss_clean_seconds': 'Очистка текстов постов одного фида',
+    'rss_db_write_seconds': 'Запись пачки постов в БД',
+    'rss_posts_total': 'Посты фидов: новые и уже известные',
+    'rss_ingest_lag_seconds': 'Задержка от публикации поста до записи в БД',
+    'rss_alert_delivery_seconds': 'Задержка от записи поста до отправки подписчику SSE',
+}
+
+
+class Histogram:
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets['+Inf'] = self.count
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class Metrics:
+    """Счетчики и гистограммы по стадиям опроса с метками (зеркало, результат)
+
+    Значения накапливаются с запуска; flush() раз в цикл отдает снимок
+    всем приемникам (консоль, JSONL-файл, Prometheus-эндпоинт). Строки
+    журнала (статусы зеркал, итоги цикла) идут через event() тем же
+    приемникам: консоль - лишь один из них.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.sinks = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(BUCKETS.get(name, DEFAULT_BUCKETS))
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                'ts': time.time(),
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'histograms': [
+                    {'name': name, 'labels': dict(labels), **histogram.snapshot()}
+                    for (name, labels), histogram in sorted(self.histograms.items())
+                ]
+            }
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def flush(self):
+        """Отдача снимка приемникам (раз в цикл опроса)"""
+        if not self.sinks:
+            return
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            try:
+                sink.write(snapshot)
+            except Exception as e:
+                print(f"⚠️ Ошибка приемника метрик {type(sink).__name__}: {e}")
+
+    def event(self, kind: str, **fields):
+        """Событие журнала - приемникам, у которых есть метод event()"""
+        for sink in self.sinks:
+            if hasattr(sink, 'event'):
+                try:
+                    sink.event(kind, fields)
+                except Exception as e:
+                    print(f"⚠️ Ошибка приемника метрик {type(sink).__name__}: {e}")
+
+    def close(self):
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+
+def totals(snapshot: dict, name: str, field: str = 'value', **labels) -> float:
+    """Сумма метрики по всем меткам (или только с заданными значениями меток)"""
+    section = 'counters' if field == 'value' else 'histograms'
+    return sum(
+        item[field] for item in snapshot[section]
+        if item['name'] == name and all(item['labels'].get(label) == value for label, value in labels.items())
+    )
+
+
+class ConsoleSink:
+    """Консоль: статусы зеркал, итоги цикла и сводка метрик (разница с предыдущим снимком)"""
+
+    def __init__(self):
+        self.previous = None
+
+    def delta(self, snapshot: dict, name: str, field: str = 'value', **labels) -> float:
+        value = totals(snapshot, name, field, **labels)
+        if self.previous:
+            value -= totals(self.previous, name, field, **labels)
+        return value
+
+    def write(self, snapshot: dict):
+        fetches = self.delta(snapshot, 'rss_fetch_seconds', 'count')
+        fetch_time = self.delta(snapshot, 'rss_fetch_seconds', 'sum')
+        downloaded = self.delta(snapshot, 'rss_fetch_bytes', 'sum')
+        lag_count = self.delta(snapshot, 'rss_ingest_lag_seconds', 'count')
+        lag_sum = self.delta(snapshot, 'rss_ingest_lag_seconds', 'sum')
+        new_posts = self.delta(snapshot, 'rss_posts_total', result='new')
+        known_posts = self.delta(snapshot, 'rss_posts_total', result='known')
+
+        print(f"📈 Метрики цикла: запросов {fetches:.0f} "
+              f"(ср. {fetch_time / fetches if fetches else 0:.2f} с, {downloaded / 1024:.0f} КБ), "
+              f"разбор {self.delta(snapshot, 'rss_parse_seconds', 'sum'):.2f} с, "
+              f"очистка {self.delta(snapshot, 'rss_clean_seconds', 'sum'):.2f} с, "
+              f"запись {self.delta(snapshot, 'rss_db_write_seconds', 'sum'):.2f} с, "
+              f"новых {new_posts:.0f}, известных {known_posts:.0f}, "
+              f"ср. задержка {lag_sum / lag_count if lag_count else 0:.0f} с")
+        self.previous = snapshot
+
+    def event(self, kind: str, fields: dict):
+        handler = getattr(self, f'print_{kind}', None)
+        if handler:
+            handler(**fields)
+
+    def print_channel(self, channel: str, mirrors: list, unique_entries: int, outcome: str):
+        print(f"\n{'='*50}")
+        print(f"Канал: {channel}")
+        print(f"{'='*50}")
+        for mirror in mirrors:
+            print(f"📡 {mirror['mirror']}: {mirror['status']}")
+        if unique_entries:
+            print(f"\n📊 Итого уникальных записей: {unique_entries}")
+        elif outcome == 'not_modified':
+            print("\n♻️ Фиды не изменились с прошлой проверки")
+        elif outcome == 'no_new':
+            print("\n♻️ Новых постов нет")
+        else:
+            print("\n❌ Не удалось получить данные")
+
+    def print_cycle(self, new_posts: int, posts_by_date: dict, seen_filter: dict, requests: int, reused: int):
+        if new_posts > 0:
+            print("\n📊 Статистика обновления:")
+            print(f"➕ Добавлено новых постов: {new_posts}")
+            if posts_by_date:
+                print("\n📅 Посты по датам:")
+                for date, count in posts_by_date.items():
+                    print(f"   {date}: {count:3d} постов")
+        else:
+            print("\n💤 Новых постов не обнаружено")
+
+        checked = seen_filter['hits'] + seen_filter['new'] + seen_filter['misses']
+        if checked:
+            print(f"🧠 Фильтр постов: известных {seen_filter['hits']}, новых {seen_filter['new']}, "
+                  f"запросов к БД {seen_filter['misses']} ({seen_filter['misses'] / checked:.0%})")
+        if requests:
+            print(f"🔌 Запросов: {requests}, через открытые соединения: {reused} ({reused / requests:.0%})")
+
+    def print_pipeline(self, processes: int, responses: int, posts: int, fetch: float, parse: float, write: float):
+        print(f"🏭 Конвейер ({processes} проц.): ответов {responses}, "
+              f"новых постов {posts}, загрузка {fetch:.1f} с, "
+              f"разбор {parse:.1f} с, запись {write:.1f} с")
+
+
+class JsonlSink:
+    """Снимки метрик и события журнала строками JSON с ротацией файла по размеру"""
+
+    def __init__(self, path: str, max_kb: int = 10240, backups: int = 3):
+        self.path = path
+        self.max_bytes = max_kb * 1024
+        self.backups = backups
+
+    def rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self, snapshot: dict):
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self.rotate()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False, default=str) + '\n')
+
+    def event(self, kind: str, fields: dict):
+        self.write({'ts': time.time(), 'event': kind, **fields})
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: dict, extra: dict = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in items.items()) + '}'
+
+
+def prometheus_text(snapshot: dict) -> str:
+    """Снимок в текстовом формате Prometheus (exposition format 0.0.4)"""
+    lines = []
+    described = set()
+
+    def describe(name: str, kind: str):
+        if name not in described:
+            described.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for item in snapshot['counters']:
+        describe(item['name'], 'counter')
+        lines.append(f"{item['name']}{format_labels(item['labels'])} {item['value']}")
+    for item in snapshot['histograms']:
+        name = item['name']
+        describe(name, 'histogram')
+        for bound, count in item['buckets'].items():
+            lines.append(f"{name}_bucket{format_labels(item['labels'], {'le': bound})} {count}")
+        lines.append(f"{name}_sum{format_labels(item['labels'])} {item['sum']}")
+        lines.append(f"{name}_count{format_labels(item['labels'])} {item['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusSink:
+    """HTTP-эндпоинт /metrics с последним снимком в формате Prometheus"""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = '0.0.0.0'):
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                # Актуальные значения, а не снимок прошлого цикла
+                body = prometheus_text(sink.metrics.snapshot()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.metrics = metrics
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"📊 Метрики Prometheus: http://{host}:{self.server.server_address[1]}/metrics")
+
+    def write(self, snapshot: dict):
+        pass
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def attach_sinks(metrics: Metrics, config: dict):
+    """Приемники метрик по секции metrics конфига"""
+    if config['console']:
+        metrics.add_sink(ConsoleSink())
+    if config['jsonl_path']:
+        metrics.add_sink(JsonlSink(config['jsonl_path'], config['jsonl_max_kb'], config['jsonl_backups']))
+    if config['prometheus_port']:
+        metrics.add_sink(PrometheusSink(metrics, config['prometheus_port'], config['prometheus_host']))
@@ -3,9 +3,10 @@ import glob
 import os
 from datetime import datetime
 import shutil
-import re
 import json
-import html
+from contextlib import closing
+from textcleanup import TextCleaner, ensure_cleanup_column
+from channels import channel_from_url
 
 def load_cleanup_config(config_file: str = "config.json") -> dict:
     """Загрузка правил очистки из конфига"""
@@ -17,78 +18,63 @@ def load_cleanup_config(config_file: str = "config.json") -> dict:
         print(f"⚠️ Ошибка загрузки конфига: {e}")
         return {}
 
-def clean_text(text: str, cleanup_config: dict) -> str:
-    """Очистка текста согласно правилам"""
-    try:
-        remove_phrases = cleanup_config.get('remove_phrases', [])
-        remove_patterns = cleanup_config.get('remove_patterns', [])
-
-        # Удаляем HTML теги
-        text = text.replace('<br>', '\n')
-        text = text.replace('<br/>', '\n')
-        text = text.replace('<p>', '\n')
-        text = text.replace('</p>', '\n')
-        text = re.sub('<[^<]+?>', '', text)
-        
-        # Декодируем HTML сущности
-        text = html.unescape(text)
-        
-        # Удаляем заданные фразы
-        for phrase in remove_phrases:
-            text = text.replace(phrase, '')
-        
-        # Удаляем паттерны
-        for pattern in remove_patterns:
-            text = re.sub(pattern, '', text)
-        
-        # Очищаем пустые строки и лишние пробелы
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        text = '\n'.join(lines)
-        
-        # Удаляем множественные переносы строк
-        text = re.sub(r'\n\s*\n', '\n\n', text)
-        
-        return text.strip()
-    except Exception as e:
-        print(f"⚠️ Ошибка при очистке текста: {e}")
-        return text
-
 def cleanup_database(db_path: str, cleanup_config: dict):
-    """Очистка текста в базе данных"""
+    """Очистка текста в базе данных
+
+    Обрабатываются только записи, очищенные другой версией правил (или
+    ещё ни разу): посты, сохраненные парсером с текущими правилами, не трогаются.
+    """
     print("\n🧹 Начинаем очистку текста в базе данных...")
+    cleaner = TextCleaner(cleanup_config)
     
     try:
         with sqlite3.connect(db_path) as conn:
             cursor = conn.cursor()
+            ensure_cleanup_column(cursor)
             
-            # Получаем все записи
-            cursor.execute('SELECT id, content FROM posts')
+            # Получаем только записи с устаревшей версией очистки
+            cursor.execute('''
+                SELECT id, content FROM posts
+                WHERE cleanup_version IS NULL OR cleanup_version != ?
+            ''', (cleaner.version,))
             records = cursor.fetchall()
             
             cleaned_count = 0
             total_records = len(records)
+            updates = []
             
-            for record_id, content in records:
-                cleaned_text = clean_text(content, cleanup_config)
+            for processed, (record_id, content) in enumerate(records, 1):
+                cleaned_text = cleaner.clean(content or '')
                 if cleaned_text != content:
-                    cursor.execute('''
-                        UPDATE posts 
-                        SET content = ? 
-                        WHERE id = ?
-                    ''', (cleaned_text, record_id))
                     cleaned_count += 1
+                updates.append((cleaned_text, cleaner.version, record_id))
                 
                 # Показываем прогресс
-                if cleaned_count % 100 == 0:
-                    print(f"✨ Обработано {cleaned_count}/{total_records} записей...")
-            
+                if processed % 1000 == 0:
+                    print(f"✨ Обработано {processed}/{total_records} записей...")
+
+            cursor.executemany('''
+                UPDATE posts 
+                SET content = ?, cleanup_version = ?
+                WHERE id = ?
+            ''', updates)
             conn.commit()
             
-        print(f"\n✅ Очистка завершена! Обновлено записей: {cleaned_count}")
+        print(f"\n✅ Очистка завершена! Проверено записей: {total_records}, обновлено текстов: {cleaned_count}")
         
     except Exception as e:
         print(f"❌ Ошибка при очистке базы данных: {e}")
 
+def table_columns(cursor, table: str) -> list:
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [row[1] for row in cursor.fetchall()]
+
+def checkpoint_wal(db_path: str) -> bool:
+    """Перенос WAL в основной файл БД перед копированием; False - БД занята другим процессом"""
+    with closing(sqlite3.connect(db_path)) as conn:
+        busy, _, _ = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    return not busy
+
 def merge_databases(output_db: str = "tg-posts.db"):
     """
     Объединяет все .db файлы в текущей директории, удаляет дубликаты,
@@ -114,6 +100,11 @@ def merge_databases(output_db: str = "tg-posts.db"):
             )
         ''')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_post_id ON posts(post_id)')
+        # Канал и версия очистки переносятся как есть: записи, уже очищенные
+        # текущими правилами, очистка после объединения не трогает
+        if 'channel' not in table_columns(cursor, 'posts'):
+            cursor.execute('ALTER TABLE posts ADD COLUMN channel TEXT')
+        ensure_cleanup_column(cursor)
         new_conn.commit()
 
     # Получаем список всех .db файлов
@@ -129,7 +120,7 @@ def merge_databases(output_db: str = "tg-posts.db"):
         print(f"\n📂 Обработка файла: {db_file}")
         
         try:
-            with sqlite3.connect(db_file) as old_conn:
+            with closing(sqlite3.connect(db_file)) as old_conn:
                 old_cursor = old_conn.cursor()
                 
                 # Подсчитываем количество записей
@@ -138,22 +129,28 @@ def merge_databases(output_db: str = "tg-posts.db"):
                 total_posts += file_posts
                 print(f"📊 Найдено записей: {file_posts}")
 
-                # Получаем все записи из старой БД
-                old_cursor.execute('''
-                    SELECT post_id, content, published_date, source_url 
+                # Получаем все записи из старой БД (в старых схемах нет channel и cleanup_version)
+                columns = table_columns(old_cursor, 'posts')
+                old_cursor.execute(f'''
+                    SELECT post_id, content, published_date, source_url,
+                           {'channel' if 'channel' in columns else 'NULL'},
+                           {'cleanup_version' if 'cleanup_version' in columns else 'NULL'}
                     FROM posts
                 ''')
                 
                 # Вставляем записи в новую БД с игнорированием дубликатов
-                with sqlite3.connect(output_db) as new_conn:
+                with closing(sqlite3.connect(output_db)) as new_conn:
                     new_cursor = new_conn.cursor()
-                    for row in old_cursor:
+                    for post_id, content, published_date, source_url, channel, version in old_cursor:
                         try:
                             new_cursor.execute('''
                                 INSERT OR IGNORE INTO posts 
-                                (post_id, content, published_date, source_url)
-                                VALUES (?, ?, ?, ?)
-                            ''', row)
+                                (post_id, content, published_date, source_url, channel, cleanup_version)
+                                VALUES (?, ?, ?, ?, ?, ?)
+                            ''', (
+                                post_id, content, published_date, source_url,
+                                channel or channel_from_url(source_url or ''), version
+                            ))
                             if new_cursor.rowcount > 0:
                                 merged_posts += 1
                     
@@ -174,10 +171,16 @@ def merge_databases(output_db: str = "tg-posts.db"):
         print("\n🔄 Создание бэкапа и удаление старых баз данных...")
         for db_file in processed_files:
             try:
-                # Создаем бэкап
-                shutil.copy2(db_file, os.path.join(backup_dir, db_file))
-                # Удаляем старый файл
-                os.remove(db_file)
+                # Без переноса WAL в бэкап попала бы неполная БД
+                if not checkpoint_wal(db_file):
+                    print(f"⚠️ {db_file} используется другим процессом, файл не удален")
+                    continue
+                # Создаем бэкап вместе с файлами WAL
+                for path in [db_file, f"{db_file}-wal", f"{db_file}-shm"]:
+                    if os.path.exists(path):
+                        shutil.copy2(path, os.path.join(backup_dir, path))
+                        # Удаляем старый файл
+                        os.remove(path)
                 print(f"✅ Удален файл: {db_file}")
             except Exception as e:
                 print(f"⚠️ Ошибка при обработке файла {db_file}: {e}")
@@ -0,0 +1,190 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import feedparser
+
+from dateparse import DateParser
+from feedstream import read_new_entries
+from textcleanup import TextCleaner
+
+# Объекты процесса-обработчика: создаются один раз при запуске процесса пула
+worker_cleaner = None
+worker_date_parser = None
+
+
+def init_worker(cleanup_config: dict):
+    global worker_cleaner, worker_date_parser
+    worker_cleaner = TextCleaner(cleanup_config)
+    worker_date_parser = DateParser()
+
+
+def parse_and_clean(body: bytes, watermark: int, host: str, stream_parse: bool = True) -> dict:
+    """Разбор ответа зеркала и очистка текстов постов (выполняется в процессе пула)"""
+    started = time.perf_counter()
+    if stream_parse:
+        entries, seen_items, reached_known = read_new_entries(body, watermark)
+    else:
+        entries = feedparser.parse(body).entries
+        seen_items, reached_known = len(entries), False
+    parse_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    posts = []
+    for entry in entries:
+        link = entry.get('link', '')
+        try:
+            published_date = worker_date_parser.parse(
+                entry.get('published', ''), host, entry.get('published_parsed')
+            )
+            posts.append({
+                'post_id': link.split('/')[-1],
+                'content': worker_cleaner.clean(entry.get('description', '')),
+                'published_date': published_date or datetime.now(timezone.utc),
+                'source_url': link
+            })
+        except Exception as e:
+            print(f"⚠️ Ошибка обработки поста {link}: {e}")
+
+    return {
+        'posts': posts,
+        'seen_items': seen_items,
+        'reached_known': reached_known,
+        'parse_elapsed': parse_elapsed,
+        'clean_elapsed': time.perf_counter() - started
+    }
+
+
+class IngestPipeline:
+    """Конвейер загрузки: потоки загрузки -> пул процессов (разбор и очистка) -> один писатель SQLite
+
+    Разбор и очистка упираются в CPU и под GIL выполняются по очереди, поэтому
+    вынесены в процессы. Число ответов между загрузкой и записью ограничено
+    queue_size: если писатель не успевает, загрузчики ждут свободного места.
+    Каналы из hedging.channels идут мимо конвейера, через хеджированную
+    загрузку парсера (ingest_hedged): там важнее первый ответ, чем разбор в процессах.
+    """
+
+    def __init__(self, parser, processes: int = 0, queue_size: int = 64):
+        self.parser = parser
+        self.processes = processes or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=init_worker,
+            initargs=(parser.config.get('text_cleanup', {}),)
+        )
+        self.stats = {'responses': 0, 'posts': 0, 'fetch': 0.0, 'parse': 0.0, 'write': 0.0}
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def run(self, channels: list, last_check_times: dict = None) -> dict:
+        """Один цикл по каналам; возвращает число новых постов по каналам"""
+        last_check_times = last_check_times or {}
+        hedge_futures = {
+            channel: self.parser.hedge_executor.submit(
+                self.parser.ingest_hedged, channel, last_check_times.get(channel)
+            )
+            for channel in channels if channel in self.parser.hedged_channels
+        }
+        regular = [channel for channel in channels if channel not in self.parser.hedged_channels]
+        sources = self.parser.source_health.order(self.parser.rss_sources)
+        jobs = [(channel, source_url) for channel in regular for source_url in sources]
+        # Место в очереди занимается до загрузки и освобождается писателем,
+        # поэтому put() в очередь писателя никогда не блокируется
+        slots = threading.BoundedSemaphore(self.queue_size)
+        parsed = queue.Queue(maxsize=self.queue_size)
+
+        def fetch(channel: str, source_url: str):
+            slots.acquire()
+            try:
+                result = self.parser.fetch_source(channel, source_url, parse=False)
+            except Exception as e:
+                result = {'source': source_url, 'url': source_url, 'status': f"❌ {e}", 'validators': None}
+            body = result.pop('body', None)
+            if body is None:
+                parsed.put((channel, result, None))
+                return
+            try:
+                future = self.pool.submit(
+                    parse_and_clean, body, result['watermark'],
+                    source_url.split('/')[2], self.parser.stream_parse
+                )
+            except Exception as e:
+                # Ответ не будет разобран: без записи в здоровье зеркало, ушедшее
+                # в пробный запрос (probing), осталось бы недоступным навсегда
+                self.parser.source_health.record(source_url, 'failure')
+                result['validators'] = None
+                result['status'] = f"❌ Пул процессов недоступен: {e}"
+                parsed.put((channel, result, None))
+                return
+            future.add_done_callback(lambda done: parsed.put((channel, result, done)))
+
+        for channel, source_url in jobs:
+            self.parser.executor.submit(fetch, channel, source_url)
+
+        new_posts = {channel: 0 for channel in regular}
+        # Ответы зеркал и разобранные post_id по каналам - для итога канала
+        channel_results = {channel: [] for channel in regular}
+        channel_posts = {channel: set() for channel in regular}
+        for _ in jobs:
+            channel, result, future = parsed.get()
+            try:
+                post_ids = self.write(channel, result, future, last_check_times.get(channel), new_posts)
+            finally:
+                slots.release()
+            channel_results[channel].append(result)
+            channel_posts[channel].update(post_ids)
+            if len(channel_results[channel]) == len(sources):
+                results = sorted(channel_results[channel], key=lambda item: sources.index(item['source']))
+                self.parser.report_channel(channel, results, len(channel_posts[channel]))
+
+        for channel, future in hedge_futures.items():
+            new_posts[channel] = future.result()
+        return new_posts
+
+    def write(self, channel: str, result: dict, future, last_check_time, new_posts: dict) -> list:
+        """Стадия писателя: итог разбора, запись новых постов и валидаторов; возвращает разобранные post_id"""
+        self.stats['responses'] += 1
+        post_ids = []
+        if result.get('latency'):
+            self.stats['fetch'] += result['latency']
+
+        if future is not None:
+            try:
+                output = future.result()
+            except Exception as e:
+                self.parser.source_health.record(result['source'], 'failure')
+                result['validators'] = None
+                result['status'] = f"❌ Ошибка разбора: {str(e)[:50]}"
+                output = None
+
+            if output is not None:
+                self.stats['parse'] += output['parse_elapsed'] + output['clean_elapsed']
+                metrics = self.parser.metrics
+                metrics.observe('rss_parse_seconds', output['parse_elapsed'], mirror=result['url'].split('/')[2])
+                metrics.observe('rss_clean_seconds', output['clean_elapsed'])
+                post_ids = [post['post_id'] for post in output['posts']]
+                self.parser.record_parsed(
+                    result, len(output['posts']), output['seen_items'], output['reached_known']
+                )
+                started = time.perf_counter()
+                saved = self.parser.save_parsed_posts(output['posts'], last_check_time)
+                self.stats['write'] += time.perf_counter() - started
+                if saved is None:
+                    # Посты не записаны: без валидаторов следующий цикл перечитает фид
+                    result['validators'] = None
+                    saved = 0
+                self.stats['posts'] += saved
+                new_posts[channel] += saved
+
+        self.parser.remember_validators(channel, [result])
+        return post_ids
+
+    def print_stats(self):
+        """Итоги конвейера - событием pipeline для приемников метрик"""
+        self.parser.metrics.event('pipeline', processes=self.processes, **self.stats)
@@ -0,0 +1,210 @@
+import argparse
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+from channels import CHANNEL_SQL
+from dateparse import parse_stored_date
+
+try:
+    import snowballstemmer
+except ImportError:
+    snowballstemmer = None
+
+# Окончания русских слов для облегченного стемминга (длинные первыми)
+RUSSIAN_ENDINGS = sorted({
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией', 'ость', 'ости', 'остью',
+    'ешь', 'ете', 'ишь', 'ите', 'ает', 'яет', 'ают', 'яют', 'ила', 'ыла', 'ена', 'ено', 'ены',
+    'ать', 'ять', 'ить', 'еть', 'ыть', 'ться', 'тся', 'ов', 'ев', 'ей', 'ой', 'ий', 'ый', 'ая',
+    'яя', 'ое', 'ее', 'ые', 'ие', 'ах', 'ях', 'ам', 'ям', 'ом', 'ем', 'ою', 'ею', 'ую', 'юю',
+    'ия', 'ью', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й'
+}, key=len, reverse=True)
+MIN_STEM = 3
+
+QUERY_TOKEN_RE = re.compile(r'"[^"]*"|\(|\)|[^\s()"]+')
+OPERATORS = {'AND', 'OR', 'NOT'}
+
+
+class RussianStemmer:
+    """Основа слова для поиска: snowballstemmer, если установлен, иначе отсечение окончаний"""
+
+    def __init__(self):
+        self.snowball = snowballstemmer.stemmer('russian') if snowballstemmer else None
+
+    def stem(self, word: str) -> str:
+        word = word.casefold().replace('ё', 'е')
+        if len(word) <= 4 or not re.search('[а-я]', word):
+            return word
+        if self.snowball:
+            return self.snowball.stemWord(word)
+        for ending in RUSSIAN_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+                return word[:-len(ending)]
+        return word
+
+
+def ensure_fts(cursor) -> bool:
+    """Индекс posts_fts по posts.content с триггерами синхронизации
+
+    При первом создании индекс заполняется из существующих постов.
+    Возвращает False, если SQLite собран без FTS5.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+    if cursor.fetchone():
+        return True
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE posts_fts USING fts5(
+                content,
+                content = 'posts',
+                content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Полнотекстовый поиск недоступен: {e}")
+        return False
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts(rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts(posts_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF content ON posts BEGIN
+            INSERT INTO posts_fts(posts_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO posts_fts(rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    print("🔎 Построение полнотекстового индекса по существующим постам...")
+    cursor.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+    return True
+
+
+def build_fts_query(query: str, stemmer: RussianStemmer) -> str:
+    """Запрос пользователя в синтаксис FTS5
+
+    Слова приводятся к основе и ищутся по префиксу (ракетами -> "ракет"*),
+    "фразы в кавычках" ищутся как есть, слово* - префикс без стемминга,
+    -слово - исключение. Поддерживаются AND, OR, NOT и скобки.
+    Исключение без слова слева (в начале запроса, после OR или
+    открывающей скобки) в FTS5 не выразить - такой запрос отклоняется
+    с ValueError.
+    """
+    parts = []
+    for token in QUERY_TOKEN_RE.findall(query):
+        if token in ('(', ')') or token in OPERATORS:
+            parts.append(token)
+            continue
+        if token.startswith('"'):
+            phrase = token.strip('"').replace('"', '')
+            if phrase:
+                parts.append(f'"{phrase}"')
+            continue
+
+        negate = token.startswith('-') and len(token) > 1
+        word = token[1:] if negate else token
+        if word.endswith('*'):
+            term = word.rstrip('*').casefold().replace('ё', 'е')
+        else:
+            term = stemmer.stem(word)
+        term = term.replace('"', '')
+        if not term:
+            continue
+        if negate:
+            if not parts or parts[-1] in OPERATORS or parts[-1] == '(':
+                raise ValueError(f"исключение {token} должно идти после других слов запроса")
+            parts.append('NOT')
+        parts.append(f'"{term}"*')
+    return ' '.join(parts)
+
+
+def parse_bound(value: str) -> datetime:
+    """Граница интервала: дата или дата и время в ISO-формате (UTC, если зона не указана)"""
+    parsed = datetime.fromisoformat(value)
+    if not parsed.tzinfo:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def search_posts(conn, query: str, channels: list = None, since: datetime = None,
+                 until: datetime = None, limit: int = 20, stemmer: RussianStemmer = None) -> list:
+    """Поиск постов по релевантности (bm25) с фильтром по каналам и времени публикации"""
+    fts_query = build_fts_query(query, stemmer or RussianStemmer())
+    if not fts_query:
+        return []
+
+    # Канал берется из ссылки: в БД, которые парсер еще не открывал, колонки channel нет
+    channel_sql = CHANNEL_SQL.format(url='p.source_url')
+    sql = f'''
+        SELECT p.post_id, {channel_sql}, p.published_date, p.source_url,
+               snippet(posts_fts, 0, '[', ']', '…', 16), bm25(posts_fts)
+        FROM posts_fts
+        JOIN posts p ON p.id = posts_fts.rowid
+        WHERE posts_fts MATCH ?
+    '''
+    params = [fts_query]
+    if channels:
+        sql += f" AND {channel_sql} IN ({','.join('?' * len(channels))})"
+        params.extend(channels)
+    sql += ' ORDER BY bm25(posts_fts)'
+
+    results = []
+    # Даты в БД бывают и ISO, и RFC 822, поэтому интервал проверяется здесь
+    for post_id, channel, published, source_url, snippet, score in conn.execute(sql, params):
+        published_date = parse_stored_date(published)
+        if since and (not published_date or published_date < since):
+            continue
+        if until and (not published_date or published_date > until):
+            continue
+        results.append({
+            'post_id': post_id,
+            'channel': channel,
+            'published_date': published_date,
+            'source_url': source_url,
+            'snippet': snippet,
+            'score': score
+        })
+        if len(results) >= limit:
+            break
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Полнотекстовый поиск по архиву постов",
+        epilog="Исключение -слово ставится после других слов. Запрос, начинающийся с '-', "
+               "передавайте после -- (опции - до него): python search.py --limit 5 -- '...'"
+    )
+    arg_parser.add_argument('query', help='запрос: слова, "фраза", префикс*, слово -исключение, AND/OR/NOT')
+    arg_parser.add_argument('--db', default='tg-posts.db', help="файл БД")
+    arg_parser.add_argument('--channel', action='append', help="канал (можно несколько раз)")
+    arg_parser.add_argument('--since', type=parse_bound, help="с даты, например 2024-11-20")
+    arg_parser.add_argument('--until', type=parse_bound, help="по дату, например 2024-11-23T12:00")
+    arg_parser.add_argument('--limit', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    with sqlite3.connect(args.db) as conn:
+        if not ensure_fts(conn.cursor()):
+            return
+        try:
+            results = search_posts(conn, args.query, args.channel, args.since, args.until, args.limit)
+        except (sqlite3.OperationalError, ValueError) as e:
+            print(f"❌ Ошибка в запросе: {e}")
+            return
+
+    print(f"🔎 Найдено: {len(results)}")
+    for result in results:
+        published = result['published_date'].strftime('%Y-%m-%d %H:%M') if result['published_date'] else '?'
+        print(f"\n[{published}] {result['channel']} ({result['score']:.2f})")
+        print(f"  {' '.join(result['snippet'].split())}")
+        print(f"  Источник: {result['source_url']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import bisect
+import hashlib
+import os
+import socket
+import sqlite3
+import time
+
+
+def hash_key(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode('utf-8')).digest()[:8], 'big')
+
+
+def worker_path(path: str, worker_id: str) -> str:
+    """Путь к файлу воркера: tg-posts.db -> tg-posts-<worker_id>.db"""
+    if not worker_id:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{worker_id}{ext}"
+
+
+class HashRing:
+    """Консистентное хеширование каналов по воркерам
+
+    У каждого воркера replicas точек на кольце; канал принадлежит первой
+    точке по часовой стрелке. При уходе воркера переезжают только его каналы.
+    """
+
+    def __init__(self, nodes: list, replicas: int = 64):
+        points = sorted(
+            (hash_key(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self.keys = [point for point, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        if not self.keys:
+            return None
+        index = bisect.bisect(self.keys, hash_key(key)) % len(self.keys)
+        return self.nodes[index]
+
+
+class WorkerLeases:
+    """Аренда воркеров в общей SQLite-таблице worker_leases
+
+    Воркер жив, пока обновляет heartbeat чаще, чем раз в ttl секунд.
+    Воркеры на разных машинах должны видеть один файл (общий диск) и
+    иметь синхронизированные часы. В channel_watermarks - последний
+    записанный post_id канала: с него начинает новый владелец канала.
+    """
+
+    def __init__(self, db_path: str, worker_id: str, ttl: float):
+        self.worker_id = worker_id
+        self.ttl = ttl
+        # Без WAL: файл может лежать на сетевом диске
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS worker_leases (
+                    worker_id TEXT PRIMARY KEY,
+                    host TEXT,
+                    pid INTEGER,
+                    heartbeat REAL,
+                    started_at REAL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS channel_watermarks (
+                    channel TEXT PRIMARY KEY,
+                    post_id INTEGER,
+                    worker_id TEXT,
+                    updated_at REAL
+                )
+            ''')
+
+    def heartbeat(self):
+        now = time.time()
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO worker_leases (worker_id, host, pid, heartbeat, started_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(worker_id) DO UPDATE SET
+                    host = excluded.host,
+                    pid = excluded.pid,
+                    heartbeat = excluded.heartbeat
+            ''', (self.worker_id, socket.gethostname(), os.getpid(), now, now))
+
+    def live_workers(self) -> list:
+        cursor = self.conn.execute(
+            'SELECT worker_id FROM worker_leases WHERE heartbeat >= ? ORDER BY worker_id',
+            (time.time() - self.ttl,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def save_watermarks(self, watermarks: dict):
+        """Последние записанные post_id каналов (водяной знак только растет)"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO channel_watermarks (channel, post_id, worker_id, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(channel) DO UPDATE SET
+                    post_id = MAX(post_id, excluded.post_id),
+                    worker_id = excluded.worker_id,
+                    updated_at = excluded.updated_at
+            ''', [(channel, post_id, self.worker_id, now) for channel, post_id in watermarks.items()])
+
+    def load_watermarks(self, channels: list) -> dict:
+        watermarks = {}
+        for start in range(0, len(channels), 500):
+            chunk = channels[start:start + 500]
+            cursor = self.conn.execute(
+                f"SELECT channel, post_id FROM channel_watermarks WHERE channel IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            watermarks.update(cursor.fetchall())
+        return watermarks
+
+    def release(self):
+        """Снятие аренды при штатной остановке: каналы сразу переходят к другим"""
+        with self.conn:
+            self.conn.execute('DELETE FROM worker_leases WHERE worker_id = ?', (self.worker_id,))
+        self.conn.close()
+
+
+class ShardCoordinator:
+    """Доля каналов воркера: heartbeat аренды и пересчет кольца по живым воркерам"""
+
+    def __init__(self, worker_id: str, config: dict):
+        self.worker_id = worker_id
+        self.leases = WorkerLeases(config['lease_db'], worker_id, config['lease_ttl'])
+        self.heartbeat_interval = config['heartbeat_interval']
+        self.replicas = config['replicas']
+        self.workers = []
+        self.next_heartbeat = 0.0
+
+    def seconds_until_heartbeat(self) -> float:
+        return max(self.next_heartbeat - time.monotonic(), 0)
+
+    def refresh(self, channels: list, owned: list) -> list:
+        """Каналы воркера; между heartbeat (или при ошибке аренды) - прежний список"""
+        if time.monotonic() < self.next_heartbeat:
+            return owned
+        self.next_heartbeat = time.monotonic() + self.heartbeat_interval
+        try:
+            self.leases.heartbeat()
+            workers = self.leases.live_workers()
+        except sqlite3.Error as e:
+            print(f"⚠️ Ошибка таблицы аренды воркеров: {e}")
+            return owned
+
+        if workers != self.workers:
+            print(f"👥 Живые воркеры: {', '.join(workers)}")
+            self.workers = workers
+        ring = HashRing(workers, self.replicas)
+        return [channel for channel in channels if ring.owner(channel) == self.worker_id]
+
+    def publish_watermarks(self, watermarks: dict):
+        """Водяные знаки своих каналов - для воркера, к которому они перейдут"""
+        try:
+            self.leases.save_watermarks({
+                channel: post_id for channel, post_id in watermarks.items() if post_id is not None
+            })
+        except sqlite3.Error as e:
+            print(f"⚠️ Ошибка записи водяных знаков каналов: {e}")
+
+    def handoff_watermarks(self, channels: list) -> dict:
+        """Водяные знаки принятых каналов, записанные прежними владельцами"""
+        try:
+            return self.leases.load_watermarks(list(channels))
+        except sqlite3.Error as e:
+            print(f"⚠️ Ошибка чтения водяных знаков каналов: {e}")
+            return {}
+
+    def release(self):
+        try:
+            self.leases.release()
+        except sqlite3.Error as e:
+            print(f"⚠️ Не удалось снять аренду воркера: {e}")
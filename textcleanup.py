@@ -0,0 +1,70 @@
+import hashlib
+import html
+import json
+import re
+
+# Версия алгоритма очистки: увеличивается при изменении шагов clean()
+ENGINE_VERSION = 2
+
+# Теги-разделители, которые превращаются в перенос строки; остальные теги удаляются
+# (<br />, как его переписывает feedparser, тоже разделитель)
+BREAK_TAGS_RE = re.compile(r'<(?:br\s*/?|/?p)>')
+TAG_RE = re.compile(r'<[^<]+?>')
+
+
+class TextCleaner:
+    """Очистка текста постов по правилам text_cleanup, скомпилированным один раз"""
+
+    def __init__(self, cleanup_config: dict):
+        phrases = [phrase for phrase in cleanup_config.get('remove_phrases', []) if phrase]
+        # Длинные фразы первыми: "🇷🇺 Приграничье - подписаться" раньше, чем "🇷🇺"
+        phrases = sorted(set(phrases), key=len, reverse=True)
+        self.phrases_re = re.compile('|'.join(map(re.escape, phrases))) if phrases else None
+        self.patterns = [re.compile(pattern) for pattern in cleanup_config.get('remove_patterns', [])]
+
+        # Версия = алгоритм + правила: при их изменении записи считаются устаревшими
+        rules = json.dumps(
+            [cleanup_config.get('remove_phrases', []), cleanup_config.get('remove_patterns', [])],
+            ensure_ascii=False, sort_keys=True
+        )
+        self.version = f"{ENGINE_VERSION}-{hashlib.sha1(rules.encode('utf-8')).hexdigest()[:12]}"
+
+    def clean(self, text: str) -> str:
+        # Обработка forwarded сообщений
+        if 'Forwarded From' in text:
+            text = text.split('</b>')[-1].strip()
+
+        # Удаляем div контейнеры
+        if '<div class="tgme_widget_message_text' in text:
+            text = text.split('dir="auto">')[-1]
+            text = text.split('</div>')[0]
+
+        # Удаляем HTML теги, но сохраняем структуру
+        if '<' in text:
+            text = TAG_RE.sub('', BREAK_TAGS_RE.sub('\n', text))
+
+        # Удаляем заданные фразы одним проходом
+        if self.phrases_re:
+            text = self.phrases_re.sub('', text)
+
+        # Удаляем паттерны по регулярным выражениям
+        for pattern in self.patterns:
+            text = pattern.sub('', text)
+
+        # Декодируем HTML сущности
+        text = html.unescape(text)
+
+        # Очищаем пустые строки и лишние пробелы; строки с фразами, появившимися
+        # после декодирования, отбрасываем (поиск по строкам - только если они есть)
+        lines = [line.strip() for line in text.splitlines()]
+        if self.phrases_re and self.phrases_re.search(text):
+            lines = [line for line in lines if not self.phrases_re.search(line)]
+
+        return '\n'.join(line for line in lines if line)
+
+
+def ensure_cleanup_column(cursor):
+    """Колонка posts.cleanup_version с версией очистки, которой обработана запись"""
+    cursor.execute('PRAGMA table_info(posts)')
+    if 'cleanup_version' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE posts ADD COLUMN cleanup_version TEXT')